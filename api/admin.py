@@ -1,10 +1,29 @@
 from django.contrib import admin
 
-from .models import FoodItem, Meal, MealFoodItem
+from .models import FoodItem, Job, Meal, MealFoodItem, NutritionGoal
+from .nutrients import NUTRIENT_NAMES, NUTRIENTS
+from .tasks import FOOD_ITEM_ENTRY_FIELDS, enqueue
+
+
+def total_display(nutrient):
+    # Columna de la lista de comidas con el total de un nutriente
+    def display(obj):
+        return round(getattr(obj, f'total_{nutrient.name}'), 2)
+    display.short_description = f'{nutrient.label} Totales'
+    display.admin_order_field = f'sum_{nutrient.name}'
+    return display
+
+
+class SoftDeleteAdminMixin:
+    # La acción de borrado en bloque pasa por Model.delete() (borrado lógico)
+    # en lugar de QuerySet.delete()
+    def delete_queryset(self, request, queryset):
+        for obj in queryset:
+            obj.delete()
 
 
 @admin.register(FoodItem)
-class FoodItemAdmin(admin.ModelAdmin):
+class FoodItemAdmin(SoftDeleteAdminMixin, admin.ModelAdmin):
     list_display = ('name', 'brand', 'calories', 'fats', 'proteins',  'carbs', 'portion_size_g',
                     'portion_unit', 'is_custom', 'created_by')
     search_fields = ('name', 'brand')
@@ -15,39 +34,50 @@ class FoodItemAdmin(admin.ModelAdmin):
             'fields': ('name', 'brand', 'portion_size_g', 'portion_unit')
         }),
         ('Información Nutricional (por la porción definida)', {
-            'fields': ('calories', 'proteins', 'fats', 'carbs', 'sugars', 'fiber', 'sodium')
+            'fields': NUTRIENT_NAMES
         }),
         ('Detalles Adicionales', {
             'fields': ('created_by', 'is_custom')
         }),
     )
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        # Las entradas en comidas se recalculan en segundo plano
+        if change and set(form.changed_data) & set(FOOD_ITEM_ENTRY_FIELDS):
+            enqueue('refresh_food_item_entries', {'food_item_id': obj.id},
+                    user=request.user)
+
+
 class MealFoodItemInline(admin.TabularInline):
     model = MealFoodItem
     extra = 1
-    readonly_fields = ('calculated_calories', 'calculated_proteins', 'calculated_fats', 'calculated_carbs')
+    readonly_fields = tuple(f'calculated_{name}' for name in NUTRIENT_NAMES)
 
 @admin.register(Meal)
-class MealAdmin(admin.ModelAdmin):
-    list_display = ('user', 'date', 'meal_type', 'total_calories', 'total_proteins', 'total_fats', 'total_carbs')
+class MealAdmin(SoftDeleteAdminMixin, admin.ModelAdmin):
+    list_display = ('user', 'date', 'meal_type',
+                    *(total_display(nutrient) for nutrient in NUTRIENTS))
     list_filter = ('date', 'meal_type', 'user')
     search_fields = ('user__username', 'food_items__name')
     date_hierarchy = 'date'
     inlines = [MealFoodItemInline]
-    
-    # Permite ver los campos calculados en la lista de comidas
-    def total_calories(self, obj):
-        return round(obj.total_calories, 2)
-    total_calories.short_description = 'Calorías Totales'
-
-    def total_proteins(self, obj):
-        return round(obj.total_proteins, 2)
-    total_proteins.short_description = 'Proteínas Totales'
-
-    def total_fats(self, obj):
-        return round(obj.total_fats, 2)
-    total_fats.short_description = 'Grasas Totales'
-
-    def total_carbs(self, obj):
-        return round(obj.total_carbs, 2)
-    total_carbs.short_description = 'Carbohidratos Totales'
+
+    # Los totales de la lista se calculan en la misma consulta
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_nutrient_totals()
+
+@admin.register(NutritionGoal)
+class NutritionGoalAdmin(admin.ModelAdmin):
+    list_display = ('user', 'start_date', 'end_date', 'calories', 'proteins', 'fats', 'carbs', 'tolerance_pct')
+    list_filter = ('user',)
+    search_fields = ('user__username',)
+    date_hierarchy = 'start_date'
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'task', 'status', 'attempts', 'max_attempts', 'created_by', 'created_at', 'finished_at')
+    list_filter = ('status', 'task')
+    readonly_fields = ('attempts', 'locked_at', 'result', 'last_error', 'created_at', 'finished_at')
+    raw_id_fields = ('parent',)
@@ -0,0 +1,113 @@
+from datetime import timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import MealFoodItem, NutritionGoal
+from .nutrients import NUTRIENT_NAMES, nutrient_sum_expressions
+
+# Nutrientes que puede fijar un objetivo diario
+GOAL_NUTRIENTS = ('calories', 'proteins', 'fats', 'carbs')
+
+# Rango por defecto y rango máximo evaluable en una sola petición (dos años)
+DEFAULT_RANGE_DAYS = 30
+MAX_RANGE_DAYS = 731
+
+
+def daily_totals(user, start, end):
+    # Una única consulta agrupada por fecha con una columna por nutriente
+    aggregates = nutrient_sum_expressions()
+    rows = (MealFoodItem.objects
+            .filter(meal__user=user, meal__is_deleted=False, meal__date__range=(start, end))
+            .values('meal__date')
+            .annotate(**aggregates)
+            .order_by())
+    return {row.pop('meal__date'): row for row in rows}
+
+
+def goals_for_range(user, start, end):
+    # Objetivos que se solapan con el rango, del más reciente al más antiguo
+    return list(NutritionGoal.objects
+                .filter(user=user, start_date__lte=end)
+                .filter(Q(end_date__isnull=True) | Q(end_date__gte=start))
+                .order_by('-start_date', '-id'))
+
+
+def _goal_for_day(goals, day):
+    # Si varios objetivos cubren el mismo día, gana el que empezó más tarde
+    for goal in goals:
+        if goal.start_date <= day and (goal.end_date is None or goal.end_date >= day):
+            return goal
+    return None
+
+
+def evaluate_goals(user, start, end):
+    totals = daily_totals(user, start, end)
+    goals = goals_for_range(user, start, end)
+
+    days = []
+    deficit_sums = {nutrient: 0.0 for nutrient in GOAL_NUTRIENTS}
+    days_with_goal = days_met = 0
+    streak = longest_streak = 0
+    # Los días futuros todavía no se pueden haber cumplido: se listan pero no
+    # cuentan para la adherencia ni cortan la racha
+    today = timezone.localdate()
+
+    # Una sola pasada lineal sobre la serie diaria
+    day = start
+    while day <= end:
+        consumed = totals.get(day, {})
+        goal = _goal_for_day(goals, day)
+        entry = {
+            'date': day,
+            'consumed': {nutrient: round(consumed.get(nutrient) or 0.0, 2)
+                         for nutrient in NUTRIENT_NAMES},
+            'goal_id': goal.id if goal else None,
+            'met': None,
+            'nutrients': {},
+        }
+        if goal is not None and day <= today:
+            tolerance = float(goal.tolerance_pct) / 100
+            met = True
+            for nutrient in GOAL_NUTRIENTS:
+                target = getattr(goal, nutrient)
+                if target is None:
+                    continue
+                target = float(target)
+                actual = consumed.get(nutrient) or 0.0
+                deficit = target - actual
+                nutrient_met = abs(deficit) <= target * tolerance
+                met = met and nutrient_met
+                deficit_sums[nutrient] += deficit
+                entry['nutrients'][nutrient] = {
+                    'target': round(target, 2),
+                    'deficit': round(deficit, 2),
+                    'met': nutrient_met,
+                }
+            entry['met'] = met
+            days_with_goal += 1
+            if met:
+                days_met += 1
+                streak += 1
+                longest_streak = max(longest_streak, streak)
+            else:
+                streak = 0
+        elif day <= today:
+            streak = 0
+        days.append(entry)
+        day += timedelta(days=1)
+
+    return {
+        'start': start,
+        'end': end,
+        'summary': {
+            'days_with_goal': days_with_goal,
+            'days_met': days_met,
+            'adherence': round(days_met / days_with_goal, 4) if days_with_goal else None,
+            'current_streak': streak,
+            'longest_streak': longest_streak,
+            'total_deficit': {nutrient: round(value, 2)
+                              for nutrient, value in deficit_sums.items()},
+        },
+        'days': days,
+    }
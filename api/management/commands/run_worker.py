@@ -0,0 +1,68 @@
+import multiprocessing
+import time
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+
+def _worker_process(poll_interval, burst):
+    # Con el método "spawn" el proceso hijo arranca sin Django configurado
+    django.setup()
+    from api.tasks import work
+    try:
+        work(poll_interval=poll_interval, burst=burst)
+    except KeyboardInterrupt:
+        pass
+
+
+class Command(BaseCommand):
+    help = "Ejecuta los trabajos en segundo plano pendientes de la tabla Job."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1,
+                            help="Número de procesos worker (por defecto 1).")
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help="Segundos de espera cuando la cola está vacía.")
+        parser.add_argument('--burst', action='store_true',
+                            help="Termina cuando no quedan trabajos pendientes.")
+
+    def handle(self, *args, **options):
+        processes = max(1, options['processes'])
+        poll_interval = options['poll_interval']
+        burst = options['burst']
+        self.stdout.write(f"Iniciando {processes} worker(s)...")
+
+        if processes == 1:
+            _worker_process(poll_interval, burst)
+        else:
+            self._run_pool(processes, poll_interval, burst)
+        self.stdout.write(self.style.SUCCESS("Workers detenidos."))
+
+    def _run_pool(self, processes, poll_interval, burst):
+        # Las conexiones abiertas no deben compartirse con los procesos hijos
+        connections.close_all()
+        workers = [self._start_worker(poll_interval, burst) for _ in range(processes)]
+        try:
+            if burst:
+                for worker in workers:
+                    worker.join()
+                return
+            # Fuera del modo burst un worker solo termina si se cae: se
+            # sustituye para que el grupo no vaya perdiendo procesos
+            while True:
+                for index, worker in enumerate(workers):
+                    if not worker.is_alive():
+                        self.stderr.write(f"Worker {worker.pid} caído "
+                                          f"(código {worker.exitcode}); reiniciando.")
+                        workers[index] = self._start_worker(poll_interval, burst)
+                time.sleep(max(poll_interval, 1.0))
+        except KeyboardInterrupt:
+            for worker in workers:
+                worker.terminate()
+
+    def _start_worker(self, poll_interval, burst):
+        worker = multiprocessing.Process(
+            target=_worker_process, args=(poll_interval, burst), daemon=True)
+        worker.start()
+        return worker
@@ -0,0 +1,110 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:31
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def assign_initial_sync_seq(apps, schema_editor):
+    # Las filas existentes reciben una secuencia para que la primera
+    # sincronización (since=0) las incluya
+    seq = 0
+    for model_name in ('FoodItem', 'Meal', 'MealFoodItem'):
+        model = apps.get_model('api', model_name)
+        rows = list(model.objects.order_by('pk'))
+        for row in rows:
+            seq += 1
+            row.sync_seq = seq
+        model.objects.bulk_update(rows, ['sync_seq'], batch_size=500)
+    apps.get_model('api', 'SyncCounter').objects.create(pk=1, value=seq)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_meal_mealfooditem_meal_food_items_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.BigIntegerField(default=0, verbose_name='Último valor')),
+            ],
+            options={
+                'verbose_name': 'Contador de sincronización',
+                'verbose_name_plural': 'Contadores de sincronización',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='meal',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='fooditem',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Fecha de eliminación'),
+        ),
+        migrations.AddField(
+            model_name='fooditem',
+            name='is_deleted',
+            field=models.BooleanField(default=False, verbose_name='¿Eliminado?'),
+        ),
+        migrations.AddField(
+            model_name='fooditem',
+            name='sync_seq',
+            field=models.BigIntegerField(db_index=True, default=0, editable=False, verbose_name='Secuencia de cambio'),
+        ),
+        migrations.AddField(
+            model_name='fooditem',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Última modificación'),
+        ),
+        migrations.AddField(
+            model_name='meal',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Fecha de eliminación'),
+        ),
+        migrations.AddField(
+            model_name='meal',
+            name='is_deleted',
+            field=models.BooleanField(default=False, verbose_name='¿Eliminado?'),
+        ),
+        migrations.AddField(
+            model_name='meal',
+            name='sync_seq',
+            field=models.BigIntegerField(db_index=True, default=0, editable=False, verbose_name='Secuencia de cambio'),
+        ),
+        migrations.AddField(
+            model_name='meal',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Última modificación'),
+        ),
+        migrations.AddField(
+            model_name='mealfooditem',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Fecha de eliminación'),
+        ),
+        migrations.AddField(
+            model_name='mealfooditem',
+            name='is_deleted',
+            field=models.BooleanField(default=False, verbose_name='¿Eliminado?'),
+        ),
+        migrations.AddField(
+            model_name='mealfooditem',
+            name='sync_seq',
+            field=models.BigIntegerField(db_index=True, default=0, editable=False, verbose_name='Secuencia de cambio'),
+        ),
+        migrations.AddField(
+            model_name='mealfooditem',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Última modificación'),
+        ),
+        migrations.AddConstraint(
+            model_name='meal',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_deleted', False)), fields=('user', 'date', 'meal_type'), name='unique_active_meal_per_type'),
+        ),
+        migrations.RunPython(assign_initial_sync_seq,
+                             migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_sync_tombstones'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NutritionGoal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_date', models.DateField(verbose_name='Fecha de inicio')),
+                ('end_date', models.DateField(blank=True, null=True, verbose_name='Fecha de fin (Opcional)')),
+                ('calories', models.DecimalField(decimal_places=2, max_digits=7, verbose_name='Calorías diarias (kcal)')),
+                ('proteins', models.DecimalField(blank=True, decimal_places=2, max_digits=7, null=True, verbose_name='Proteínas diarias (g)')),
+                ('fats', models.DecimalField(blank=True, decimal_places=2, max_digits=7, null=True, verbose_name='Grasas diarias (g)')),
+                ('carbs', models.DecimalField(blank=True, decimal_places=2, max_digits=7, null=True, verbose_name='Carbohidratos diarios (g)')),
+                ('tolerance_pct', models.DecimalField(decimal_places=2, default=10.0, max_digits=5, verbose_name='Tolerancia (%)')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='nutrition_goals', to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Objetivo nutricional',
+                'verbose_name_plural': 'Objetivos nutricionales',
+                'ordering': ['-start_date'],
+            },
+        ),
+    ]
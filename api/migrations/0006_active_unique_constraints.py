@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:47
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_job'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='mealfooditem',
+            unique_together=set(),
+        ),
+        migrations.AlterField(
+            model_name='fooditem',
+            name='name',
+            field=models.CharField(max_length=255, verbose_name='Nombre del alimento'),
+        ),
+        migrations.AddConstraint(
+            model_name='fooditem',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_deleted', False)), fields=('name',), name='unique_active_food_name'),
+        ),
+        migrations.AddConstraint(
+            model_name='mealfooditem',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_deleted', False)), fields=('meal', 'food_item'), name='unique_active_meal_food_item'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:47
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_active_unique_constraints'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='nutritiongoal',
+            name='calories',
+            field=models.DecimalField(decimal_places=2, max_digits=7, validators=[django.core.validators.MinValueValidator(0)], verbose_name='Calorías diarias (kcal)'),
+        ),
+        migrations.AlterField(
+            model_name='nutritiongoal',
+            name='carbs',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=7, null=True, validators=[django.core.validators.MinValueValidator(0)], verbose_name='Carbohidratos diarios (g)'),
+        ),
+        migrations.AlterField(
+            model_name='nutritiongoal',
+            name='fats',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=7, null=True, validators=[django.core.validators.MinValueValidator(0)], verbose_name='Grasas diarias (g)'),
+        ),
+        migrations.AlterField(
+            model_name='nutritiongoal',
+            name='proteins',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=7, null=True, validators=[django.core.validators.MinValueValidator(0)], verbose_name='Proteínas diarias (g)'),
+        ),
+        migrations.AlterField(
+            model_name='nutritiongoal',
+            name='tolerance_pct',
+            field=models.DecimalField(decimal_places=2, default=10.0, max_digits=5, validators=[django.core.validators.MinValueValidator(0)], verbose_name='Tolerancia (%)'),
+        ),
+    ]
@@ -1,10 +1,103 @@
 from django.contrib.auth.models import User
-from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.validators import MinValueValidator
+from django.db import models, transaction
+from django.db.models import F, OuterRef, Q, Subquery
+from django.utils import timezone
 
+from .nutrients import (NUTRIENT_NAMES, calculate_nutrients,
+                        nutrient_sum_expressions, sum_nutrients)
 
-class FoodItem(models.Model):
+
+class SyncCounter(models.Model):
+    # Fila única con la secuencia global de cambios usada por /api/sync/
+    value = models.BigIntegerField(default=0, verbose_name="Último valor")
+
+    class Meta:
+        verbose_name = "Contador de sincronización"
+        verbose_name_plural = "Contadores de sincronización"
+
+    def __str__(self):
+        return f"Secuencia de sincronización: {self.value}"
+
+
+def next_sync_seq(count=1):
+    # Reserva `count` valores consecutivos de la secuencia y devuelve el último.
+    # Debe llamarse dentro de la misma transacción que guarda las filas: el
+    # bloqueo sobre el contador se mantiene hasta el commit, así que las filas
+    # se vuelven visibles en el mismo orden que sus números de secuencia.
+    updated = SyncCounter.objects.filter(
+        pk=1).update(value=F('value') + count)
+    if not updated:
+        SyncCounter.objects.get_or_create(pk=1)
+        SyncCounter.objects.filter(pk=1).update(value=F('value') + count)
+    return SyncCounter.objects.values_list('value', flat=True).get(pk=1)
+
+
+class ActiveManager(models.Manager):
+    # Oculta las filas borradas lógicamente (tombstones)
+    def get_queryset(self):
+        return super().get_queryset().filter(is_deleted=False)
+
+
+class MealQuerySet(models.QuerySet):
+    def with_nutrient_totals(self):
+        # Totales de todos los nutrientes en la misma consulta (sum_calories,
+        # sum_proteins...). Cada uno es una subconsulta correlacionada, así no
+        # se multiplican cuando la consulta principal añade otros joins sobre
+        # los alimentos (por ejemplo, las búsquedas del admin).
+        items = (MealFoodItem.objects.filter(meal=OuterRef('pk'))
+                 .order_by().values('meal'))
+        return self.annotate(**{
+            f'sum_{name}': Subquery(items.annotate(total=expression).values('total'),
+                                    output_field=models.FloatField())
+            for name, expression in nutrient_sum_expressions().items()
+        })
+
+
+class SyncModel(models.Model):
+    # Campos comunes para la sincronización incremental de clientes offline
+    updated_at = models.DateTimeField(
+        auto_now=True, verbose_name="Última modificación")
+    sync_seq = models.BigIntegerField(
+        default=0, db_index=True, editable=False, verbose_name="Secuencia de cambio")
+    is_deleted = models.BooleanField(
+        default=False, verbose_name="¿Eliminado?")
+    deleted_at = models.DateTimeField(
+        null=True, blank=True, verbose_name="Fecha de eliminación")
+
+    objects = ActiveManager()
+    all_objects = models.Manager()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            self.sync_seq = next_sync_seq()
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {
+                    *update_fields, 'sync_seq', 'updated_at'}
+            super().save(*args, **kwargs)
+
+    def soft_delete(self):
+        # Deja un tombstone en lugar de borrar la fila, para que los clientes
+        # puedan enterarse de la eliminación en la próxima sincronización
+        self.is_deleted = True
+        self.deleted_at = timezone.now()
+        self.save(update_fields=['is_deleted', 'deleted_at'])
+
+    def delete(self, *args, **kwargs):
+        # Cualquier borrado (admin, inlines...) deja también un tombstone; un
+        # borrado físico no llegaría nunca a las réplicas offline
+        self.soft_delete()
+        return 0, {}
+
+
+class FoodItem(SyncModel):
     # Campos básicos del alimento
-    name = models.CharField(max_length=255, unique=True,
+    name = models.CharField(max_length=255,
                             verbose_name="Nombre del alimento")
     brand = models.CharField(max_length=255, blank=True,
                              null=True, verbose_name="Marca (Opcional)")
@@ -41,6 +134,12 @@ class FoodItem(models.Model):
         verbose_name = "Alimento"
         verbose_name_plural = "Alimentos"
         ordering = ['name']
+        # El nombre es único entre los alimentos no eliminados
+        constraints = [
+            models.UniqueConstraint(
+                fields=['name'], condition=Q(is_deleted=False),
+                name='unique_active_food_name'),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.portion_size_g}{self.portion_unit}) - {self.calories} kcal"
@@ -52,7 +151,7 @@ class FoodItem(models.Model):
         super().save(*args, **kwargs)
 
 
-class Meal(models.Model):
+class Meal(SyncModel):
     MEAL_TYPES = [
         ('desayuno', 'Desayuno'),
         ('media_manana', 'Media Mañana'),
@@ -72,35 +171,49 @@ class Meal(models.Model):
     food_items = models.ManyToManyField(
         FoodItem, through='MealFoodItem', related_name='meals_included', verbose_name="Alimentos")
 
+    objects = ActiveManager.from_queryset(MealQuerySet)()
+    all_objects = models.Manager.from_queryset(MealQuerySet)()
+
     class Meta:
         verbose_name = "Comida"
         verbose_name_plural = "Comidas"
-        # Un usuario solo puede tener un tipo de comida por día
-        unique_together = ('user', 'date', 'meal_type')
+        # Un usuario solo puede tener un tipo de comida por día (sin contar
+        # las comidas eliminadas, que se conservan como tombstones)
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'date', 'meal_type'], condition=Q(is_deleted=False),
+                name='unique_active_meal_per_type'),
+        ]
         ordering = ['date', 'meal_type']
 
     def __str__(self):
         return f"{self.get_meal_type_display()} de {self.user.username} en {self.date}"
 
-    # Propiedades calculadas para sumar los macros de la comida
-    @property
-    def total_calories(self):
-        return sum(item.calculated_calories for item in self.meal_food_items.all())
-
-    @property
-    def total_proteins(self):
-        return sum(item.calculated_proteins for item in self.meal_food_items.all())
+    def soft_delete(self):
+        with transaction.atomic():
+            for item in self.meal_food_items.all():
+                item.soft_delete()
+            super().soft_delete()
 
-    @property
-    def total_fats(self):
-        return sum(item.calculated_fats for item in self.meal_food_items.all())
+    def save(self, *args, **kwargs):
+        self._nutrient_totals = None
+        super().save(*args, **kwargs)
 
-    @property
-    def total_carbs(self):
-        return sum(item.calculated_carbs for item in self.meal_food_items.all())
+    def nutrient_totals(self):
+        # Totales de todos los nutrientes registrados. Usa los valores
+        # anotados por MealQuerySet.with_nutrient_totals() si existen; si no,
+        # recorre los alimentos una sola vez y guarda el resultado.
+        if getattr(self, '_nutrient_totals', None) is None:
+            if all(hasattr(self, f'sum_{name}') for name in NUTRIENT_NAMES):
+                self._nutrient_totals = {
+                    name: getattr(self, f'sum_{name}') or 0 for name in NUTRIENT_NAMES}
+            else:
+                self._nutrient_totals = sum_nutrients(
+                    self.meal_food_items.all())
+        return self._nutrient_totals
 
 
-class MealFoodItem(models.Model):
+class MealFoodItem(SyncModel):
     meal = models.ForeignKey(Meal, on_delete=models.CASCADE,
                              related_name='meal_food_items', verbose_name="Comida")
     food_item = models.ForeignKey(
@@ -111,32 +224,137 @@ class MealFoodItem(models.Model):
     class Meta:
         verbose_name = "Alimento en Comida"
         verbose_name_plural = "Alimentos en Comidas"
-        unique_together = ('meal', 'food_item')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['meal', 'food_item'], condition=Q(is_deleted=False),
+                name='unique_active_meal_food_item'),
+        ]
 
     def __str__(self):
         return f"{self.quantity} {self.food_item.portion_unit} of {self.food_item.name} in {self.meal}"
 
-    # Propiedades calculadas para este alimento en esta cantidad
-    @property
-    def calculated_calories(self):
-        if self.food_item.portion_size_g:
-            return (self.food_item.calories / self.food_item.portion_size_g) * self.quantity
-        return 0
-
-    @property
-    def calculated_proteins(self):
-        if self.food_item.portion_size_g:
-            return (self.food_item.proteins / self.food_item.portion_size_g) * self.quantity
-        return 0
-
-    @property
-    def calculated_fats(self):
-        if self.food_item.portion_size_g:
-            return (self.food_item.fats / self.food_item.portion_size_g) * self.quantity
-        return 0
-
-    @property
-    def calculated_carbs(self):
-        if self.food_item.portion_size_g:
-            return (self.food_item.carbs / self.food_item.portion_size_g) * self.quantity
-        return 0
+    def calculated_nutrients(self):
+        # Valores de todos los nutrientes para la cantidad consumida; se
+        # recalculan solo si cambia la cantidad o el alimento
+        key = (self.quantity, self.food_item_id)
+        if getattr(self, '_nutrient_cache_key', None) != key:
+            self._nutrients = calculate_nutrients(
+                self.food_item, self.quantity)
+            self._nutrient_cache_key = key
+        return self._nutrients
+
+
+# Propiedades calculadas (calculated_<nutriente> y total_<nutriente>) para
+# cada nutriente registrado en api.nutrients
+for _name in NUTRIENT_NAMES:
+    setattr(MealFoodItem, f'calculated_{_name}', property(
+        lambda self, name=_name: self.calculated_nutrients()[name]))
+    setattr(Meal, f'total_{_name}', property(
+        lambda self, name=_name: self.nutrient_totals()[name]))
+
+
+class NutritionGoal(models.Model):
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='nutrition_goals', verbose_name="Usuario")
+    # Rango de vigencia del objetivo; sin fecha de fin sigue vigente
+    start_date = models.DateField(verbose_name="Fecha de inicio")
+    end_date = models.DateField(
+        null=True, blank=True, verbose_name="Fecha de fin (Opcional)")
+
+    # Objetivos diarios; los macros son opcionales
+    calories = models.DecimalField(
+        max_digits=7, decimal_places=2, validators=[MinValueValidator(0)],
+        verbose_name="Calorías diarias (kcal)")
+    proteins = models.DecimalField(
+        max_digits=7, decimal_places=2, blank=True, null=True, validators=[MinValueValidator(0)],
+        verbose_name="Proteínas diarias (g)")
+    fats = models.DecimalField(
+        max_digits=7, decimal_places=2, blank=True, null=True, validators=[MinValueValidator(0)],
+        verbose_name="Grasas diarias (g)")
+    carbs = models.DecimalField(
+        max_digits=7, decimal_places=2, blank=True, null=True, validators=[MinValueValidator(0)],
+        verbose_name="Carbohidratos diarios (g)")
+
+    # Margen aceptado alrededor del objetivo para considerarlo cumplido
+    tolerance_pct = models.DecimalField(
+        max_digits=5, decimal_places=2, default=10.00, validators=[MinValueValidator(0)],
+        verbose_name="Tolerancia (%)")
+
+    class Meta:
+        verbose_name = "Objetivo nutricional"
+        verbose_name_plural = "Objetivos nutricionales"
+        ordering = ['-start_date']
+
+    def __str__(self):
+        end = self.end_date or "sin fin"
+        return f"{self.calories} kcal para {self.user.username} ({self.start_date} - {end})"
+
+
+class JobQuerySet(models.QuerySet):
+    def with_children_counts(self):
+        # Número de trabajos hijos por estado (children_pending...), en la
+        # misma consulta que los trabajos
+        return self.annotate(**{
+            f'children_{status}': models.Count('children', filter=Q(children__status=status))
+            for status, _ in Job.STATUSES
+        })
+
+
+class Job(models.Model):
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUSES = [
+        (STATUS_PENDING, 'Pendiente'),
+        (STATUS_RUNNING, 'En ejecución'),
+        (STATUS_SUCCEEDED, 'Completado'),
+        (STATUS_FAILED, 'Fallido'),
+    ]
+
+    # Nombre de la tarea registrada en api.tasks y sus argumentos
+    task = models.CharField(max_length=100, verbose_name="Tarea")
+    payload = models.JSONField(
+        default=dict, encoder=DjangoJSONEncoder, verbose_name="Argumentos")
+    status = models.CharField(
+        max_length=20, choices=STATUSES, default=STATUS_PENDING, verbose_name="Estado")
+
+    # Control de reintentos y de bloqueo por parte de los workers
+    attempts = models.PositiveIntegerField(default=0, verbose_name="Intentos")
+    max_attempts = models.PositiveIntegerField(
+        default=3, verbose_name="Intentos máximos")
+    run_after = models.DateTimeField(
+        default=timezone.now, verbose_name="Ejecutar a partir de")
+    locked_at = models.DateTimeField(
+        null=True, blank=True, verbose_name="Bloqueado en")
+
+    result = models.JSONField(
+        null=True, blank=True, encoder=DjangoJSONEncoder, verbose_name="Resultado")
+    last_error = models.TextField(blank=True, verbose_name="Último error")
+
+    # Las tareas grandes se reparten en trabajos hijos (por bloques)
+    parent = models.ForeignKey(
+        'self', on_delete=models.CASCADE, null=True, blank=True, related_name='children', verbose_name="Trabajo padre")
+    created_by = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name='jobs', verbose_name="Creado por")
+    created_at = models.DateTimeField(
+        auto_now_add=True, verbose_name="Fecha de creación")
+    finished_at = models.DateTimeField(
+        null=True, blank=True, verbose_name="Fecha de finalización")
+
+    objects = JobQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Trabajo en segundo plano"
+        verbose_name_plural = "Trabajos en segundo plano"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'run_after'],
+                         name='job_status_run_after_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.task} #{self.pk} ({self.get_status_display()})"
+
+    def children_counts(self):
+        return {status: getattr(self, f'children_{status}') for status, _ in self.STATUSES}
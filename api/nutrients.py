@@ -0,0 +1,56 @@
+from collections import namedtuple
+from decimal import Decimal
+
+from django.db.models import F, FloatField, Sum, Value
+from django.db.models.functions import Cast, Coalesce, NullIf
+
+# Cada nutriente corresponde a un campo de FoodItem con el valor por porción.
+# Para añadir uno nuevo (vitaminas, minerales...) basta con crear el campo en
+# FoodItem y registrarlo aquí: modelos, serializadores, admin y los totales
+# consumidos del progreso de objetivos lo recogen automáticamente. Para poder
+# fijarlo como objetivo hay que añadir además el campo a NutritionGoal y a
+# GOAL_NUTRIENTS (api/goals.py).
+Nutrient = namedtuple('Nutrient', ['name', 'label', 'unit'])
+
+NUTRIENTS = (
+    Nutrient('calories', 'Calorías', 'kcal'),
+    Nutrient('proteins', 'Proteínas', 'g'),
+    Nutrient('fats', 'Grasas', 'g'),
+    Nutrient('carbs', 'Carbohidratos', 'g'),
+    Nutrient('sugars', 'Azúcares', 'g'),
+    Nutrient('fiber', 'Fibra', 'g'),
+    Nutrient('sodium', 'Sodio', 'mg'),
+)
+
+NUTRIENT_NAMES = tuple(nutrient.name for nutrient in NUTRIENTS)
+
+
+def calculate_nutrients(food_item, quantity):
+    # Valores para la cantidad consumida, todos en una sola pasada
+    if not food_item.portion_size_g:
+        return {name: 0 for name in NUTRIENT_NAMES}
+    factor = quantity / food_item.portion_size_g
+    return {name: (getattr(food_item, name) or Decimal(0)) * factor
+            for name in NUTRIENT_NAMES}
+
+
+def sum_nutrients(meal_food_items):
+    # Suma de todos los nutrientes recorriendo las filas una única vez
+    totals = {name: 0 for name in NUTRIENT_NAMES}
+    for item in meal_food_items:
+        for name, value in item.calculated_nutrients().items():
+            totals[name] += value
+    return totals
+
+
+def nutrient_sum_expressions():
+    # Expresiones SUM (una columna por nutriente) para agregar en SQL sobre
+    # MealFoodItem. Se convierte a float antes de dividir para evitar la
+    # división entera de SQLite, y NullIf evita dividir por una porción de 0 g.
+    portion = NullIf(Cast('food_item__portion_size_g', FloatField()), 0)
+    return {
+        name: Sum(Coalesce(Cast(F(f'food_item__{name}'), FloatField()), Value(0.0))
+                  * F('quantity') / portion,
+                  output_field=FloatField())
+        for name in NUTRIENT_NAMES
+    }
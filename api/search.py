@@ -0,0 +1,89 @@
+import hashlib
+import threading
+
+from django.core.cache import cache
+from django.db.models import Max, Q
+
+from .models import FoodItem
+
+# Los resultados de cada búsqueda normalizada se guardan unos segundos
+SEARCH_CACHE_TIMEOUT = 30
+# Tiempo máximo que una petición espera a otra idéntica en curso
+SEARCH_WAIT_TIMEOUT = 10
+
+# Búsquedas en ejecución en este proceso, por clave de caché
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.failed = False
+
+
+def normalize_query(query):
+    # Solo se eliminan los espacios sobrantes. Las mayúsculas se dejan a
+    # icontains: en SQLite solo ignora mayúsculas en ASCII, así que pasar la
+    # consulta a minúsculas rompería búsquedas como "Ñame".
+    return ' '.join(query.split())
+
+
+def filter_food_items(queryset, normalized):
+    return queryset.filter(Q(name__icontains=normalized) |
+                           Q(brand__icontains=normalized))
+
+
+def food_search_version():
+    # La versión sale de la base de datos y no de la caché: cada save(),
+    # borrado lógico o importación masiva (también desde los procesos de
+    # run_worker) asigna una secuencia de cambio nueva y deja obsoletas las
+    # búsquedas cacheadas en cualquier proceso. Los cambios que no pasan por
+    # save() ni reservan secuencia (QuerySet.update) solo se ven al caducar
+    # la entrada, como mucho SEARCH_CACHE_TIMEOUT segundos después.
+    return FoodItem.all_objects.aggregate(version=Max('sync_seq'))['version'] or 0
+
+
+def _cache_key(normalized):
+    # Las consultas ASCII comparten entrada sin distinguir mayúsculas porque
+    # icontains devuelve lo mismo; el resto se guarda tal cual
+    if normalized.isascii():
+        normalized = normalized.casefold()
+    digest = hashlib.md5(normalized.encode()).hexdigest()
+    return f'food_search:{food_search_version()}:{digest}'
+
+
+def coalesced_search(query, execute):
+    # Devuelve execute(consulta_normalizada) reutilizando la caché o, si otra
+    # petición idéntica ya está consultando la base de datos en este
+    # proceso, esperando a su resultado en lugar de repetir la consulta.
+    normalized = normalize_query(query)
+    key = _cache_key(normalized)
+    result = cache.get(key)
+    if result is not None:
+        return result
+
+    with _inflight_lock:
+        flight = _inflight.get(key)
+        leader = flight is None
+        if leader:
+            flight = _inflight[key] = _Flight()
+
+    if not leader:
+        # Si la petición líder falla o tarda demasiado, se consulta aparte
+        if flight.done.wait(SEARCH_WAIT_TIMEOUT) and not flight.failed:
+            return flight.result
+        return execute(normalized)
+
+    try:
+        flight.result = execute(normalized)
+        cache.set(key, flight.result, SEARCH_CACHE_TIMEOUT)
+        return flight.result
+    except Exception:
+        flight.failed = True
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+        flight.done.set()
@@ -1,8 +1,23 @@
+from datetime import timedelta
+
 from django.contrib.auth.models import User
+from django.db.models import Count
+from django.utils import timezone
 from rest_framework import serializers
+from rest_framework.validators import UniqueValidator
 from rest_framework_simplejwt.tokens import RefreshToken
 
-from .models import FoodItem, Meal, MealFoodItem
+from .goals import DEFAULT_RANGE_DAYS, MAX_RANGE_DAYS
+from .models import FoodItem, Job, Meal, MealFoodItem, NutritionGoal
+from .nutrients import NUTRIENT_NAMES
+
+
+def nutrient_fields(prefix):
+    return {
+        f'{prefix}_{name}': serializers.DecimalField(
+            max_digits=10, decimal_places=2, read_only=True)
+        for name in NUTRIENT_NAMES
+    }
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -68,6 +83,15 @@ class FoodItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = FoodItem
         fields = '__all__'
+        # El nombre solo debe ser único entre los alimentos no eliminados
+        extra_kwargs = {
+            'name': {'validators': [UniqueValidator(
+                queryset=FoodItem.objects.all(),
+                message="Ya existe un alimento con este nombre.")]}
+        }
+        # El propietario y los campos de sincronización los gestiona el servidor
+        read_only_fields = ['created_by', 'is_custom',
+                            'updated_at', 'sync_seq', 'is_deleted', 'deleted_at']
 
 
 class MealFoodItemSerializer(serializers.ModelSerializer):
@@ -79,51 +103,41 @@ class MealFoodItemSerializer(serializers.ModelSerializer):
     food_item_portion_unit = serializers.CharField(
         source='food_item.portion_unit', read_only=True)
 
-    # Campos calculados, solo lectura
-    calculated_calories = serializers.DecimalField(
-        max_digits=10, decimal_places=2, read_only=True)
-    calculated_proteins = serializers.DecimalField(
-        max_digits=10, decimal_places=2, read_only=True)
-    calculated_fats = serializers.DecimalField(
-        max_digits=10, decimal_places=2, read_only=True)
-    calculated_carbs = serializers.DecimalField(
-        max_digits=10, decimal_places=2, read_only=True)
-
     class Meta:
         model = MealFoodItem
         fields = [
-            'id', 'food_item', 'food_item_name', 'food_item_brand', 'food_item_portion_unit', 'quantity',
-            'calculated_calories', 'calculated_proteins', 'calculated_fats', 'calculated_carbs'
+            'id', 'food_item', 'food_item_name', 'food_item_brand', 'food_item_portion_unit', 'quantity'
         ]
         # Para POST: Solo necesitamos food_item (ID) y quantity
         extra_kwargs = {
             'food_item': {'write_only': True}
         }
 
+    def get_fields(self):
+        # Campos calculados de solo lectura, uno por nutriente registrado
+        fields = super().get_fields()
+        fields.update(nutrient_fields('calculated'))
+        return fields
+
 
 class MealSerializer(serializers.ModelSerializer):
     # Permite anidar los MealFoodItems para la creación/visualización
     meal_food_items = MealFoodItemSerializer(many=True)
 
-    # Campos calculados de solo lectura para la suma total de la comida
-    total_calories = serializers.DecimalField(
-        max_digits=10, decimal_places=2, read_only=True)
-    total_proteins = serializers.DecimalField(
-        max_digits=10, decimal_places=2, read_only=True)
-    total_fats = serializers.DecimalField(
-        max_digits=10, decimal_places=2, read_only=True)
-    total_carbs = serializers.DecimalField(
-        max_digits=10, decimal_places=2, read_only=True)
-
     class Meta:
         model = Meal
         fields = [
-            'id', 'user', 'date', 'meal_type', 'meal_food_items',
-            'total_calories', 'total_proteins', 'total_fats', 'total_carbs'
+            'id', 'user', 'date', 'meal_type', 'meal_food_items'
         ]
         # El usuario se asignará automáticamente en la vista
         read_only_fields = ['user']
 
+    def get_fields(self):
+        # Campos calculados de solo lectura para la suma total de la comida
+        fields = super().get_fields()
+        fields.update(nutrient_fields('total'))
+        return fields
+
     def create(self, validated_data):
         # Extrae los alimentos de la comida
         meal_food_items_data = validated_data.pop('meal_food_items')
@@ -158,3 +172,87 @@ class MealSerializer(serializers.ModelSerializer):
         # 3. Eliminar los MealFoodItems existentes que no estén en meal_food_items_data.
 
         return instance
+
+
+class SyncMealSerializer(serializers.ModelSerializer):
+    # Versión plana de la comida para /api/sync/: los alimentos viajan aparte
+    class Meta:
+        model = Meal
+        fields = [
+            'id', 'user', 'date', 'meal_type',
+            'updated_at', 'sync_seq', 'is_deleted', 'deleted_at'
+        ]
+        read_only_fields = fields
+
+
+class SyncMealFoodItemSerializer(MealFoodItemSerializer):
+    class Meta(MealFoodItemSerializer.Meta):
+        fields = MealFoodItemSerializer.Meta.fields + [
+            'meal', 'updated_at', 'sync_seq', 'is_deleted', 'deleted_at'
+        ]
+        read_only_fields = fields
+        extra_kwargs = {}
+
+
+class NutritionGoalSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = NutritionGoal
+        fields = [
+            'id', 'user', 'start_date', 'end_date',
+            'calories', 'proteins', 'fats', 'carbs', 'tolerance_pct'
+        ]
+        # El usuario se asignará automáticamente en la vista
+        read_only_fields = ['user']
+
+    def validate(self, data):
+        start_date = data.get('start_date', getattr(self.instance, 'start_date', None))
+        end_date = data.get('end_date', getattr(self.instance, 'end_date', None))
+        if end_date is not None and start_date is not None and end_date < start_date:
+            raise serializers.ValidationError(
+                {"end_date": "La fecha de fin no puede ser anterior a la de inicio."})
+        return data
+
+
+class GoalProgressQuerySerializer(serializers.Serializer):
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+
+    def validate(self, data):
+        # Por defecto, los últimos DEFAULT_RANGE_DAYS días hasta hoy
+        data.setdefault('end', timezone.localdate())
+        data.setdefault('start', data['end'] - timedelta(days=DEFAULT_RANGE_DAYS - 1))
+        if data['start'] > data['end']:
+            raise serializers.ValidationError(
+                "La fecha de inicio no puede ser posterior a la de fin.")
+        if (data['end'] - data['start']).days >= MAX_RANGE_DAYS:
+            raise serializers.ValidationError(
+                f"El rango no puede superar {MAX_RANGE_DAYS} días.")
+        return data
+
+
+class FoodItemImportSerializer(serializers.Serializer):
+    # Los alimentos se validan uno a uno en segundo plano
+    items = serializers.ListField(
+        child=serializers.DictField(), allow_empty=False)
+
+
+class JobSerializer(serializers.ModelSerializer):
+    # Resumen del estado de los trabajos hijos cuando la tarea se reparte
+    children = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Job
+        fields = [
+            'id', 'task', 'status', 'attempts', 'max_attempts', 'result',
+            'last_error', 'parent', 'children', 'created_at', 'finished_at'
+        ]
+        read_only_fields = fields
+
+    def get_children(self, obj):
+        # Usa los conteos de JobQuerySet.with_children_counts() si existen
+        if hasattr(obj, f'children_{Job.STATUS_PENDING}'):
+            counts = obj.children_counts()
+        else:
+            rows = obj.children.values('status').annotate(total=Count('id')).order_by()
+            counts = {row['status']: row['total'] for row in rows}
+        return {status: total for status, total in counts.items() if total}
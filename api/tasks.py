@@ -0,0 +1,257 @@
+import logging
+import time
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .goals import evaluate_goals
+from .models import FoodItem, Job, MealFoodItem, next_sync_seq
+from .nutrients import NUTRIENT_NAMES
+from .serializers import FoodItemSerializer
+
+logger = logging.getLogger(__name__)
+
+# Tamaño de los bloques en los que se reparten las tareas grandes
+CHUNK_SIZE = 500
+# Un trabajo en ejecución sin terminar pasado este tiempo se da por perdido
+# (worker caído) y vuelve a estar disponible
+STALE_AFTER = timedelta(minutes=10)
+# Espera antes de reintentar: RETRY_BASE_SECONDS * 2^(intento - 1)
+RETRY_BASE_SECONDS = 5
+
+# Campos de FoodItem que forman parte de la representación de MealFoodItem
+FOOD_ITEM_ENTRY_FIELDS = (
+    'name', 'brand', 'portion_size_g', 'portion_unit', *NUTRIENT_NAMES,
+)
+
+TASKS = {}
+
+
+def task(name=None):
+    # Registra una función como tarea ejecutable por los workers
+    def decorator(func):
+        TASKS[name or func.__name__] = func
+        return func
+    return decorator
+
+
+class DatabaseJobBackend:
+    # Cola sobre la tabla Job. Para usar un broker externo basta con apuntar
+    # settings.JOB_BACKEND a otra clase con el mismo método enqueue().
+    def enqueue(self, task_name, payload=None, user=None, parent=None, max_attempts=3):
+        if task_name not in TASKS:
+            raise ValueError(f"Tarea desconocida: {task_name}")
+        return Job.objects.create(
+            task=task_name, payload=payload or {}, created_by=user,
+            parent=parent, max_attempts=max_attempts)
+
+
+def get_job_backend():
+    backend = getattr(settings, 'JOB_BACKEND', 'api.tasks.DatabaseJobBackend')
+    return import_string(backend)()
+
+
+def enqueue(task_name, payload=None, **kwargs):
+    return get_job_backend().enqueue(task_name, payload, **kwargs)
+
+
+def _claimable(now):
+    # Un trabajo abandonado solo se reintenta si le quedan intentos
+    return (Q(status=Job.STATUS_PENDING, run_after__lte=now) |
+            Q(status=Job.STATUS_RUNNING, locked_at__lt=now - STALE_AFTER,
+              attempts__lt=F('max_attempts')))
+
+
+def fail_exhausted_jobs(now):
+    # Trabajos abandonados sin intentos restantes (por ejemplo, una tarea
+    # que tumba al worker cada vez): se marcan como fallidos
+    exhausted = Job.objects.filter(status=Job.STATUS_RUNNING, locked_at__lt=now - STALE_AFTER,
+                                   attempts__gte=F('max_attempts'))
+    parent_ids = set(exhausted.exclude(parent=None).values_list('parent_id', flat=True))
+    failed = exhausted.update(
+        status=Job.STATUS_FAILED, finished_at=now, locked_at=None,
+        last_error="El worker no terminó el trabajo en ninguno de los intentos.")
+    for parent_id in parent_ids:
+        finish_parent(parent_id)
+    return failed
+
+
+def finish_parent(job_id):
+    # Un trabajo repartido en hijos sigue en ejecución (sin bloqueo) hasta
+    # que terminan todos; entonces falla si ha fallado alguno. El UPDATE
+    # condicional evita que dos hijos que acaban a la vez lo cierren dos veces.
+    if job_id is None:
+        return
+    children = Job.objects.filter(parent_id=job_id)
+    if children.filter(status__in=(Job.STATUS_PENDING, Job.STATUS_RUNNING)).exists():
+        return
+    status = (Job.STATUS_FAILED if children.filter(status=Job.STATUS_FAILED).exists()
+              else Job.STATUS_SUCCEEDED)
+    finished = (Job.objects
+                .filter(pk=job_id, status=Job.STATUS_RUNNING, locked_at__isnull=True)
+                .update(status=status, finished_at=timezone.now()))
+    if finished:
+        finish_parent(Job.objects.filter(pk=job_id).values_list('parent_id', flat=True).first())
+
+
+def claim_next_job():
+    # Reclama un trabajo con un UPDATE condicional: si otro worker se
+    # adelanta, el UPDATE no afecta a ninguna fila y se prueba el siguiente.
+    # Funciona igual en SQLite y en Postgres, sin SELECT ... FOR UPDATE.
+    now = timezone.now()
+    fail_exhausted_jobs(now)
+    candidates = (Job.objects.filter(_claimable(now))
+                  .order_by('run_after', 'id')
+                  .values_list('id', flat=True)[:10])
+    for job_id in candidates:
+        claimed = (Job.objects.filter(_claimable(now), pk=job_id)
+                   .update(status=Job.STATUS_RUNNING, locked_at=now,
+                           attempts=F('attempts') + 1))
+        if claimed:
+            return Job.objects.get(pk=job_id)
+    return None
+
+
+def run_job(job):
+    try:
+        result = TASKS[job.task](job, **job.payload)
+    except Exception as exc:
+        logger.exception("Error ejecutando %s", job)
+        job.last_error = repr(exc)
+        if job.attempts >= job.max_attempts:
+            job.status = Job.STATUS_FAILED
+            job.finished_at = timezone.now()
+        else:
+            job.status = Job.STATUS_PENDING
+            job.run_after = timezone.now() + timedelta(
+                seconds=RETRY_BASE_SECONDS * 2 ** (job.attempts - 1))
+        job.locked_at = None
+        job.save(update_fields=['status', 'last_error', 'finished_at',
+                                'run_after', 'locked_at'])
+        if job.status == Job.STATUS_FAILED:
+            finish_parent(job.parent_id)
+        return job
+
+    job.result = result
+    job.locked_at = None
+    if job.children.exists():
+        # Se queda en ejecución hasta que terminen sus trabajos hijos
+        job.save(update_fields=['result', 'locked_at'])
+        finish_parent(job.id)
+        job.refresh_from_db()
+        return job
+
+    job.status = Job.STATUS_SUCCEEDED
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'result', 'finished_at', 'locked_at'])
+    finish_parent(job.parent_id)
+    return job
+
+
+def work(poll_interval=1.0, burst=False):
+    # Bucle principal de un worker. En modo burst termina al vaciar la cola.
+    while True:
+        # Descarta conexiones caídas o caducadas (reinicio de Postgres...)
+        close_old_connections()
+        try:
+            job = claim_next_job()
+            if job is not None:
+                run_job(job)
+                continue
+        except DatabaseError:
+            # Un error de la base de datos ("database is locked" en SQLite,
+            # conexión perdida...) no debe tumbar el worker. Si el trabajo ya
+            # estaba reclamado, se recupera pasado STALE_AFTER.
+            logger.exception("Error de base de datos en el worker; se reintenta")
+            time.sleep(poll_interval)
+            continue
+        if burst:
+            return
+        time.sleep(poll_interval)
+
+
+def _chunks(items, size=None):
+    size = size or CHUNK_SIZE
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+@task()
+def refresh_food_item_entries(job, food_item_id):
+    # Tras editar un alimento, todas sus entradas en comidas cambian su
+    # representación (valores calculados, nombre...). Se reparten en bloques
+    # por rango de id para no bloquear la tabla en una sola transacción.
+    ids = list(MealFoodItem.objects.filter(food_item_id=food_item_id)
+               .order_by('id').values_list('id', flat=True))
+    chunks = list(_chunks(ids))
+    for chunk in chunks:
+        enqueue('touch_meal_food_items',
+                {'food_item_id': food_item_id,
+                 'first_id': chunk[0], 'last_id': chunk[-1]},
+                user=job.created_by, parent=job)
+    return {'rows': len(ids), 'chunks': len(chunks)}
+
+
+@task()
+def touch_meal_food_items(job, food_item_id, first_id, last_id):
+    # Asigna una nueva secuencia de cambio a cada entrada del bloque para que
+    # los clientes offline la reciban en la próxima sincronización
+    with transaction.atomic():
+        rows = list(MealFoodItem.objects.filter(
+            food_item_id=food_item_id, id__range=(first_id, last_id)).order_by('id'))
+        if not rows:
+            return {'rows': 0}
+        last_seq = next_sync_seq(len(rows))
+        now = timezone.now()
+        for offset, row in enumerate(rows, start=last_seq - len(rows) + 1):
+            row.sync_seq = offset
+            row.updated_at = now
+        MealFoodItem.objects.bulk_update(rows, ['sync_seq', 'updated_at'])
+    return {'rows': len(rows)}
+
+
+@task()
+def import_food_items(job, items):
+    # Las importaciones grandes se reparten en trabajos hijos
+    if len(items) > CHUNK_SIZE:
+        chunks = list(_chunks(items))
+        for chunk in chunks:
+            enqueue('import_food_items', {'items': chunk},
+                    user=job.created_by, parent=job)
+        return {'items': len(items), 'chunks': len(chunks)}
+
+    foods, errors, names = [], [], set()
+    for index, item in enumerate(items):
+        serializer = FoodItemSerializer(data=item)
+        if not serializer.is_valid():
+            errors.append({'index': index, 'errors': serializer.errors})
+            continue
+        name = serializer.validated_data['name']
+        if name in names:
+            errors.append({'index': index, 'errors': {
+                'name': ["Nombre repetido en la importación."]}})
+            continue
+        names.add(name)
+        serializer.validated_data.pop('created_by', None)
+        serializer.validated_data.pop('is_custom', None)
+        foods.append(FoodItem(**serializer.validated_data,
+                              created_by=job.created_by,
+                              is_custom=job.created_by is not None))
+
+    # bulk_create no pasa por save(): las secuencias se reservan en bloque
+    with transaction.atomic():
+        if foods:
+            last_seq = next_sync_seq(len(foods))
+            for offset, food in enumerate(foods, start=last_seq - len(foods) + 1):
+                food.sync_seq = offset
+            FoodItem.objects.bulk_create(foods)
+    return {'created': len(foods), 'errors': errors}
+
+
+@task()
+def goal_progress_report(job, start, end):
+    return evaluate_goals(job.created_by, date.fromisoformat(start), date.fromisoformat(end))
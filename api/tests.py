@@ -1,3 +1,509 @@
+import threading
+from datetime import date, timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import OperationalError
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from . import tasks
+from .goals import evaluate_goals
+from .models import FoodItem, Job, Meal, MealFoodItem
+from .nutrients import NUTRIENT_NAMES
+from .search import coalesced_search
+from .throttling import AuthRateThrottle, FoodSearchRateThrottle, WriteRateThrottle
+
+
+class APITestMixin:
+    def setUp(self):
+        # Los límites de peticiones y la caché de búsquedas viven en la caché
+        cache.clear()
+        self.user = User.objects.create_user('ana', 'ana@example.com', 'clave-segura')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.chicken = FoodItem.objects.create(
+            name='Pechuga de Pollo', calories=165, proteins=31, fats=3.6, carbs=0)
+        self.rice = FoodItem.objects.create(
+            name='Arroz Blanco Cocido', calories=130, proteins=2.7, fats=0.3, carbs=28)
+
+    def create_meal(self, meal_date='2026-10-01', meal_type='almuerzo', items=None):
+        items = items or [(self.chicken, '150'), (self.rice, '100')]
+        response = self.client.post('/api/meals/', {
+            'date': meal_date,
+            'meal_type': meal_type,
+            'meal_food_items': [{'food_item': food.id, 'quantity': quantity}
+                                for food, quantity in items],
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data
+
+
+class SyncTests(APITestMixin, TestCase):
+    def test_initial_sync_returns_user_changes(self):
+        meal = self.create_meal()
+        response = self.client.get('/api/sync/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([m['id'] for m in response.data['meals']], [meal['id']])
+        self.assertEqual(len(response.data['meal_food_items']), 2)
+        self.assertFalse(response.data['has_more'])
+
+    def test_cursor_only_returns_newer_changes(self):
+        self.create_meal()
+        cursor = self.client.get('/api/sync/').data['cursor']
+        self.assertEqual(self.client.get(f'/api/sync/?since={cursor}').data['meals'], [])
+
+        meal = self.create_meal(meal_type='cena')
+        response = self.client.get(f'/api/sync/?since={cursor}')
+        self.assertEqual([m['id'] for m in response.data['meals']], [meal['id']])
+        self.assertGreater(response.data['cursor'], cursor)
+
+    def test_pagination_does_not_skip_changes(self):
+        for meal_type in ('desayuno', 'almuerzo', 'cena'):
+            self.create_meal(meal_type=meal_type)
+        seen, cursor, has_more = set(), 0, True
+        while has_more:
+            response = self.client.get(f'/api/sync/?since={cursor}&limit=2')
+            seen.update(('meal', m['id']) for m in response.data['meals'])
+            seen.update(('item', i['id']) for i in response.data['meal_food_items'])
+            cursor, has_more = response.data['cursor'], response.data['has_more']
+        self.assertEqual(len(seen), 3 + 6)
+
+    def test_deleted_meal_is_synced_as_tombstone(self):
+        meal = self.create_meal()
+        cursor = self.client.get('/api/sync/').data['cursor']
+        self.assertEqual(self.client.delete(f'/api/meals/{meal["id"]}').status_code, 204)
+
+        response = self.client.get(f'/api/sync/?since={cursor}')
+        self.assertEqual([(m['id'], m['is_deleted']) for m in response.data['meals']],
+                         [(meal['id'], True)])
+        self.assertTrue(all(i['is_deleted'] for i in response.data['meal_food_items']))
+        self.assertEqual(self.client.get('/api/meals/').data, [])
+        # Una comida eliminada no impide volver a registrar la misma
+        self.create_meal()
+
+    def test_other_users_changes_are_not_synced(self):
+        other = User.objects.create_user('luis', 'luis@example.com', 'clave-segura')
+        Meal.objects.create(user=other, date=date(2026, 10, 1), meal_type='cena')
+        self.assertEqual(self.client.get('/api/sync/').data['meals'], [])
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get('/api/sync/?since=abc').status_code, 400)
+
+
+class FoodItemTombstoneTests(APITestMixin, TestCase):
+    def create_food(self, name='Mi alimento'):
+        response = self.client.post('/api/foods/', {'name': name, 'calories': '50'}, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data
+
+    def test_name_of_deleted_food_can_be_reused(self):
+        food = self.create_food()
+        self.assertEqual(self.client.delete(f'/api/foods/{food["id"]}').status_code, 204)
+        self.assertTrue(FoodItem.all_objects.get(pk=food['id']).is_deleted)
+        self.create_food()
+
+    def test_duplicate_active_name_is_rejected(self):
+        self.create_food()
+        response = self.client.post('/api/foods/', {'name': 'Mi alimento'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('name', response.data)
+
+    def test_owner_cannot_be_changed(self):
+        other = User.objects.create_user('luis', 'luis@example.com', 'clave-segura')
+        food = self.create_food()
+        response = self.client.patch(f'/api/foods/{food["id"]}',
+                                     {'created_by': other.id, 'is_custom': False}, format='json')
+        self.assertEqual(response.status_code, 200)
+        food = FoodItem.objects.get(pk=food['id'])
+        self.assertEqual(food.created_by, self.user)
+        self.assertTrue(food.is_custom)
+
+    def test_only_own_foods_are_editable(self):
+        response = self.client.patch(f'/api/foods/{self.chicken.id}', {'calories': '1'}, format='json')
+        self.assertEqual(response.status_code, 404)
+
+    def test_admin_delete_leaves_tombstones(self):
+        meal = self.create_meal()
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'clave-segura')
+        self.client.force_login(admin)
+        response = self.client.post(f'/admin/api/fooditem/{self.rice.id}/delete/', {'post': 'yes'})
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(FoodItem.all_objects.get(pk=self.rice.id).is_deleted)
+        self.assertEqual(MealFoodItem.objects.filter(meal_id=meal['id']).count(), 2)
+
+        response = self.client.post('/admin/api/meal/', {
+            'action': 'delete_selected', '_selected_action': [meal['id']], 'post': 'yes'})
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(Meal.all_objects.get(pk=meal['id']).is_deleted)
+        self.assertFalse(MealFoodItem.objects.filter(meal_id=meal['id']).exists())
+        self.assertEqual(MealFoodItem.all_objects.filter(meal_id=meal['id']).count(), 2)
+
+
+class GoalProgressTests(APITestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.today = timezone.localdate()
+
+    def day(self, offset):
+        return (self.today + timedelta(days=offset)).isoformat()
+
+    def create_goal(self, **data):
+        data = {'start_date': self.day(-30), 'calories': '400', **data}
+        response = self.client.post('/api/goals/', data, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data
+
+    def progress(self, start, end):
+        response = self.client.get(f'/api/goals/progress/?start={start}&end={end}')
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def test_adherence_deficits_and_streaks(self):
+        self.create_goal(proteins='50')
+        # 377.5 kcal y 49.2 g de proteína: dentro del 10 % de tolerancia
+        self.create_meal(meal_date=self.day(-3))
+        self.create_meal(meal_date=self.day(-2))
+        self.create_meal(meal_date=self.day(-1), items=[(self.rice, '100')])
+        self.create_meal(meal_date=self.day(0))
+
+        data = self.progress(self.day(-3), self.day(0))
+        summary = data['summary']
+        self.assertEqual(summary['days_with_goal'], 4)
+        self.assertEqual(summary['days_met'], 3)
+        self.assertEqual(summary['adherence'], 0.75)
+        self.assertEqual(summary['current_streak'], 1)
+        self.assertEqual(summary['longest_streak'], 2)
+        self.assertEqual(data['days'][2]['nutrients']['calories']['deficit'], 270.0)
+        self.assertEqual(data['days'][0]['consumed']['calories'], 377.5)
+
+    def test_future_days_are_not_evaluated(self):
+        self.create_goal()
+        self.create_meal(meal_date=self.day(0))
+        data = self.progress(self.day(0), self.day(5))
+        self.assertEqual(len(data['days']), 6)
+        self.assertEqual(data['summary']['days_with_goal'], 1)
+        self.assertEqual(data['summary']['adherence'], 1.0)
+        self.assertEqual(data['summary']['current_streak'], 1)
+        self.assertIsNone(data['days'][-1]['met'])
+
+    def test_latest_goal_wins(self):
+        self.create_goal()
+        later = self.create_goal(start_date=self.day(-1), end_date=self.day(-1), calories='1000')
+        days = self.progress(self.day(-2), self.day(0))['days']
+        self.assertEqual([d['goal_id'] for d in days][1], later['id'])
+        self.assertNotEqual(days[0]['goal_id'], later['id'])
+
+    def test_evaluation_uses_constant_queries(self):
+        self.create_goal()
+        for offset in range(-10, 0):
+            self.create_meal(meal_date=self.day(offset))
+        with self.assertNumQueries(2):
+            evaluate_goals(self.user, self.today - timedelta(days=365), self.today)
+
+    def test_invalid_goals_are_rejected(self):
+        for data in ({'calories': '-1'}, {'proteins': '-5'}, {'tolerance_pct': '-1'},
+                     {'end_date': self.day(-31)}):
+            response = self.client.post('/api/goals/', {
+                'start_date': self.day(-30), 'calories': '400', **data}, format='json')
+            self.assertEqual(response.status_code, 400, data)
+
+    def test_invalid_range_is_rejected(self):
+        response = self.client.get(f'/api/goals/progress/?start={self.day(0)}&end={self.day(-1)}')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(f'/api/goals/progress/?start={self.day(-800)}&end={self.day(0)}')
+        self.assertEqual(response.status_code, 400)
+
+
+class JobQueueTests(APITestMixin, TestCase):
+    def test_food_import_runs_in_background(self):
+        items = [{'name': f'Importado {i}', 'calories': str(i)} for i in range(5)]
+        items += [{'name': 'Importado 1'}, {'calories': 'x'}, {'name': 'Pechuga de Pollo'}]
+        response = self.client.post('/api/foods/import/', {'items': items}, format='json')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['status'], Job.STATUS_PENDING)
+
+        tasks.work(burst=True)
+        job = self.client.get(f'/api/jobs/{response.data["id"]}').data
+        self.assertEqual(job['status'], Job.STATUS_SUCCEEDED)
+        self.assertEqual(job['result']['created'], 5)
+        self.assertEqual([error['index'] for error in job['result']['errors']], [5, 6, 7])
+        food = FoodItem.objects.get(name='Importado 3')
+        self.assertEqual(food.created_by, self.user)
+        self.assertGreater(food.sync_seq, 0)
+
+    def test_large_jobs_are_chunked(self):
+        items = [{'name': f'Importado {i}'} for i in range(7)]
+        with mock.patch.object(tasks, 'CHUNK_SIZE', 3):
+            response = self.client.post('/api/foods/import/', {'items': items}, format='json')
+            tasks.work(burst=True)
+        job = self.client.get(f'/api/jobs/{response.data["id"]}').data
+        self.assertEqual(job['result'], {'items': 7, 'chunks': 3})
+        self.assertEqual(job['children'], {Job.STATUS_SUCCEEDED: 3})
+        self.assertEqual(FoodItem.objects.filter(name__startswith='Importado').count(), 7)
+
+    def test_parent_job_waits_for_its_children(self):
+        items = [{'name': f'Importado {i}'} for i in range(7)]
+        with mock.patch.object(tasks, 'CHUNK_SIZE', 3):
+            response = self.client.post('/api/foods/import/', {'items': items}, format='json')
+            tasks.run_job(tasks.claim_next_job())
+            job = self.client.get(f'/api/jobs/{response.data["id"]}').data
+            self.assertEqual(job['status'], Job.STATUS_RUNNING)
+            self.assertIsNone(job['finished_at'])
+            self.assertEqual(job['children'], {Job.STATUS_PENDING: 3})
+
+            tasks.run_job(tasks.claim_next_job())
+            job = self.client.get(f'/api/jobs/{response.data["id"]}').data
+            self.assertEqual(job['status'], Job.STATUS_RUNNING)
+
+            tasks.work(burst=True)
+        job = self.client.get(f'/api/jobs/{response.data["id"]}').data
+        self.assertEqual(job['status'], Job.STATUS_SUCCEEDED)
+        self.assertIsNotNone(job['finished_at'])
+
+    def test_parent_job_fails_when_a_child_fails(self):
+        def fan_out(job):
+            for _ in range(2):
+                tasks.enqueue('failing', user=job.created_by, parent=job, max_attempts=1)
+
+        failing = mock.Mock(side_effect=RuntimeError('fallo'))
+        with mock.patch.dict(tasks.TASKS, {'fan_out': fan_out, 'failing': failing}):
+            parent = tasks.enqueue('fan_out', user=self.user)
+            with self.assertLogs('api.tasks', 'ERROR'):
+                tasks.work(burst=True)
+        job = self.client.get(f'/api/jobs/{parent.id}').data
+        self.assertEqual(job['status'], Job.STATUS_FAILED)
+        self.assertEqual(job['children'], {Job.STATUS_FAILED: 2})
+
+    def test_food_edit_refreshes_meal_entries_for_sync(self):
+        food = self.client.post('/api/foods/', {'name': 'Mi alimento', 'calories': '100'},
+                                format='json').data
+        meal = self.create_meal(items=[(FoodItem.objects.get(pk=food['id']), '200')])
+        cursor = self.client.get('/api/sync/').data['cursor']
+        self.client.patch(f'/api/foods/{food["id"]}', {'calories': '150'}, format='json')
+        tasks.work(burst=True)
+
+        items = self.client.get(f'/api/sync/?since={cursor}').data['meal_food_items']
+        self.assertEqual([(i['meal'], i['calculated_calories']) for i in items],
+                         [(meal['id'], '300.00')])
+
+    def test_failed_jobs_are_retried_until_max_attempts(self):
+        failing = mock.Mock(side_effect=RuntimeError('fallo'))
+        with mock.patch.dict(tasks.TASKS, {'failing': failing}):
+            job = tasks.enqueue('failing', max_attempts=2)
+            with self.assertLogs('api.tasks', 'ERROR'):
+                tasks.work(burst=True)
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts), (Job.STATUS_PENDING, 1))
+            self.assertGreater(job.run_after, timezone.now())
+            self.assertIn('fallo', job.last_error)
+
+            Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+            with self.assertLogs('api.tasks', 'ERROR'):
+                tasks.work(burst=True)
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts), (Job.STATUS_FAILED, 2))
+        self.assertEqual(failing.call_count, 2)
+
+    def test_stale_jobs_are_reclaimed_or_failed(self):
+        stale = timezone.now() - tasks.STALE_AFTER - timedelta(seconds=1)
+        retry = tasks.enqueue('goal_progress_report', {'start': '2026-10-01', 'end': '2026-10-02'})
+        exhausted = tasks.enqueue('goal_progress_report', {'start': '2026-10-01', 'end': '2026-10-02'})
+        Job.objects.filter(pk=retry.pk).update(status=Job.STATUS_RUNNING, locked_at=stale, attempts=1)
+        Job.objects.filter(pk=exhausted.pk).update(status=Job.STATUS_RUNNING, locked_at=stale, attempts=3)
+
+        tasks.work(burst=True)
+        retry.refresh_from_db()
+        exhausted.refresh_from_db()
+        self.assertEqual((retry.status, retry.attempts), (Job.STATUS_SUCCEEDED, 2))
+        self.assertEqual((exhausted.status, exhausted.attempts), (Job.STATUS_FAILED, 3))
+
+    def test_worker_survives_database_errors(self):
+        job = tasks.enqueue('goal_progress_report', {'start': '2026-10-01', 'end': '2026-10-02'})
+        real_claim = tasks.claim_next_job
+        calls = []
+
+        def flaky_claim():
+            calls.append(1)
+            if len(calls) == 1:
+                raise OperationalError('database is locked')
+            return real_claim()
+
+        with mock.patch.object(tasks, 'claim_next_job', flaky_claim), \
+                self.assertLogs('api.tasks', 'ERROR'):
+            tasks.work(poll_interval=0, burst=True)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_SUCCEEDED)
+
+    def test_job_list_uses_constant_queries(self):
+        for _ in range(5):
+            parent = tasks.enqueue('import_food_items', {'items': []}, user=self.user)
+            tasks.enqueue('import_food_items', {'items': []}, user=self.user, parent=parent)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/jobs/')
+        self.assertEqual(len(response.data), 5)
+        self.assertEqual(response.data[0]['children'], {Job.STATUS_PENDING: 1})
+
+    def test_report_range_is_capped(self):
+        today = timezone.localdate()
+        response = self.client.post('/api/goals/progress/report/', {
+            'start': (today - timedelta(days=800)).isoformat(), 'end': today.isoformat()},
+            format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Job.objects.exists())
+
+        response = self.client.post('/api/goals/progress/report/', {}, format='json')
+        self.assertEqual(response.status_code, 202)
+        tasks.work(burst=True)
+        job = self.client.get(f'/api/jobs/{response.data["id"]}').data
+        self.assertEqual(len(job['result']['days']), 30)
+
+    def test_other_users_jobs_are_hidden(self):
+        other = User.objects.create_user('luis', 'luis@example.com', 'clave-segura')
+        job = tasks.enqueue('import_food_items', {'items': []}, user=other)
+        self.assertEqual(self.client.get(f'/api/jobs/{job.id}').status_code, 404)
+
+
+class NutrientRegistryTests(APITestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        FoodItem.objects.filter(pk=self.chicken.pk).update(sugars=2, sodium=70)
+        self.chicken.refresh_from_db()
+
+    def test_serializers_expose_every_registered_nutrient(self):
+        meal = self.create_meal()
+        for name in NUTRIENT_NAMES:
+            self.assertIn(f'total_{name}', meal)
+            self.assertIn(f'calculated_{name}', meal['meal_food_items'][0])
+        self.assertEqual(meal['total_calories'], '377.50')
+        self.assertEqual(meal['total_sodium'], '105.00')
+        self.assertEqual(meal['total_sugars'], '3.00')
+        self.assertEqual(meal['total_fiber'], '0.00')
+
+    def test_python_and_sql_totals_match(self):
+        meal = self.create_meal()
+        python_totals = Meal.objects.get(pk=meal['id']).nutrient_totals()
+        sql_totals = Meal.objects.with_nutrient_totals().get(pk=meal['id']).nutrient_totals()
+        for name in NUTRIENT_NAMES:
+            self.assertAlmostEqual(float(python_totals[name]), sql_totals[name], places=2)
+
+    def test_deleted_items_are_not_counted(self):
+        meal = self.create_meal()
+        MealFoodItem.objects.get(meal_id=meal['id'], food_item=self.rice).delete()
+        self.assertEqual(Meal.objects.with_nutrient_totals().get(pk=meal['id']).total_calories, 247.5)
+        self.assertEqual(Meal.objects.get(pk=meal['id']).total_calories, 247.5)
+
+    def test_meal_list_uses_constant_queries(self):
+        for meal_type in ('desayuno', 'almuerzo', 'cena'):
+            self.create_meal(meal_type=meal_type)
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/meals/')
+        self.assertEqual(len(response.data), 3)
+
+    def test_admin_search_does_not_multiply_totals(self):
+        # "o" coincide con los dos alimentos de la comida
+        meal = self.create_meal()
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'clave-segura')
+        self.client.force_login(admin)
+        for url in ('/admin/api/meal/', '/admin/api/meal/?q=o'):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            meals = list(response.context['cl'].result_list)
+            self.assertEqual([m.pk for m in meals], [meal['id']])
+            self.assertAlmostEqual(meals[0].total_calories, 377.5)
+
+
+class FoodSearchTests(APITestMixin, TestCase):
+    def search(self, query):
+        response = self.client.get('/api/foods/', {'search': query})
+        self.assertEqual(response.status_code, 200)
+        return [food['name'] for food in response.data]
+
+    def test_search_matches_name_and_brand(self):
+        FoodItem.objects.create(name='Yogur natural', brand='Granja del Pollo')
+        self.assertEqual(self.search('  POLLO '), ['Pechuga de Pollo', 'Yogur natural'])
+        self.assertEqual(self.search('arroz   blanco'), ['Arroz Blanco Cocido'])
+
+    def test_non_ascii_search(self):
+        FoodItem.objects.create(name='Ñame Cocido')
+        FoodItem.objects.create(name='Átún en lata')
+        self.assertEqual(self.search('Ñame'), ['Ñame Cocido'])
+        self.assertEqual(self.search('Átún'), ['Átún en lata'])
+
+    def test_cached_results_follow_food_changes(self):
+        self.assertEqual(self.search('Lenteja'), [])
+        response = self.client.post('/api/foods/', {'name': 'Lentejas'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.search('lenteja'), ['Lentejas'])
+
+        self.assertEqual(self.client.delete(f'/api/foods/{response.data["id"]}').status_code, 204)
+        self.assertEqual(self.search('Lenteja'), [])
+
+    def test_cached_results_follow_background_imports(self):
+        # La importación la ejecuta otro proceso: no puede avisar a la caché
+        # local del servidor, la versión se lee de la base de datos
+        self.assertEqual(self.search('Importado'), [])
+        self.client.post('/api/foods/import/', {'items': [{'name': 'Importado'}]},
+                         format='json')
+        with mock.patch.object(cache, 'set'), mock.patch.object(cache, 'delete'):
+            tasks.work(burst=True)
+        self.assertEqual(self.search('Importado'), ['Importado'])
+
+    def test_identical_searches_share_one_query(self):
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def execute(normalized):
+            calls.append(normalized)
+            started.set()
+            release.wait(5)
+            return [normalized]
+
+        results = []
+        with mock.patch('api.search.food_search_version', return_value=1):
+            threads = [threading.Thread(
+                target=lambda: results.append(coalesced_search('pollo  asado', execute)))
+                for _ in range(5)]
+            threads[0].start()
+            self.assertTrue(started.wait(5))
+            for thread in threads[1:]:
+                thread.start()
+            release.set()
+            for thread in threads:
+                thread.join(5)
+        self.assertEqual(calls, ['pollo asado'])
+        self.assertEqual(results, [['pollo asado']] * 5)
+
+    def test_searches_and_writes_are_throttled(self):
+        with mock.patch.object(FoodSearchRateThrottle, 'THROTTLE_RATES',
+                               {'food_search': '2/min'}):
+            for expected in (200, 200, 429):
+                response = self.client.get('/api/foods/', {'search': 'pollo'})
+                self.assertEqual(response.status_code, expected)
+            # El listado sin búsqueda no cuenta para el límite
+            self.assertEqual(self.client.get('/api/foods/').status_code, 200)
+
+        with mock.patch.object(WriteRateThrottle, 'THROTTLE_RATES', {'writes': '1/min'}):
+            self.assertEqual(self.client.post('/api/foods/', {'name': 'Uno'}).status_code, 201)
+            self.assertEqual(self.client.post('/api/foods/', {'name': 'Dos'}).status_code, 429)
+
+    def test_registration_and_tokens_have_their_own_limit(self):
+        anonymous = APIClient()
+
+        def register(username):
+            return anonymous.post('/api/register/', {
+                'username': username, 'email': f'{username}@example.com',
+                'password': 'Clave-segura-1', 'password2': 'Clave-segura-1'}, format='json')
 
-# Create your tests here.
+        with mock.patch.object(WriteRateThrottle, 'THROTTLE_RATES', {'writes': '1/min'}), \
+                mock.patch.object(AuthRateThrottle, 'THROTTLE_RATES', {'auth': '3/min'}):
+            self.assertEqual(register('uno').status_code, 201)
+            self.assertEqual(register('dos').status_code, 201)
+            token = anonymous.post('/api/token/', {'username': 'uno', 'password': 'Clave-segura-1'},
+                                   format='json')
+            self.assertEqual(token.status_code, 200)
+            self.assertEqual(register('tres').status_code, 429)
+            # Las escrituras de los usuarios autenticados no comparten el límite
+            self.assertEqual(self.client.post('/api/foods/', {'name': 'Uno'}).status_code, 201)
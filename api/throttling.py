@@ -0,0 +1,33 @@
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.throttling import AnonRateThrottle, UserRateThrottle
+
+
+class FoodSearchRateThrottle(UserRateThrottle):
+    # Limita por usuario las búsquedas de alimentos (GET /api/foods/?search=)
+    scope = 'food_search'
+
+    def allow_request(self, request, view):
+        if request.method != 'GET' or 'search' not in request.query_params:
+            return True
+        return super().allow_request(request, view)
+
+
+class WriteRateThrottle(UserRateThrottle):
+    # Limita por usuario las peticiones autenticadas que modifican datos. Las
+    # anónimas (registro, token) tienen su propio límite: AuthRateThrottle.
+    scope = 'writes'
+
+    def allow_request(self, request, view):
+        if request.method in SAFE_METHODS or not request.user.is_authenticated:
+            return True
+        return super().allow_request(request, view)
+
+
+class AuthRateThrottle(AnonRateThrottle):
+    # Limita por IP el registro y la obtención de tokens (fuerza bruta)
+    scope = 'auth'
+
+    def allow_request(self, request, view):
+        if request.method in SAFE_METHODS:
+            return True
+        return super().allow_request(request, view)
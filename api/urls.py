@@ -2,15 +2,36 @@ from django.urls import path
 from rest_framework_simplejwt.views import (TokenObtainPairView,
                                             TokenRefreshView)
 
-from .views import (FoodItemListViewCreate, MealListCreateView,
-                    MealRetrieveUpdateDestroyView, RegisterView)
+from .throttling import AuthRateThrottle
+from .views import (FoodItemImportView, FoodItemListViewCreate,
+                    FoodItemRetrieveUpdateDestroyView, GoalProgressReportView,
+                    GoalProgressView, JobListView, JobRetrieveView,
+                    MealListCreateView, MealRetrieveUpdateDestroyView,
+                    NutritionGoalListCreateView,
+                    NutritionGoalRetrieveUpdateDestroyView, RegisterView,
+                    SyncView)
 
 urlpatterns = [
     path('register/', RegisterView.as_view(), name='register'),
-    path('token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
-    path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('token/', TokenObtainPairView.as_view(throttle_classes=[AuthRateThrottle]),
+         name='token_obtain_pair'),
+    path('token/refresh/', TokenRefreshView.as_view(throttle_classes=[AuthRateThrottle]),
+         name='token_refresh'),
     path('foods/', FoodItemListViewCreate.as_view(), name='food_list_create'),
+    path('foods/import/', FoodItemImportView.as_view(), name='food_import'),
+    path('foods/<int:pk>', FoodItemRetrieveUpdateDestroyView.as_view(),
+         name='food_retrieve_update_destroy'),
     path('meals/', MealListCreateView.as_view(), name='meal_list_create'),
     path('meals/<int:pk>', MealRetrieveUpdateDestroyView.as_view(),
-         name='meal_retrieve_update_destroy')
+         name='meal_retrieve_update_destroy'),
+    path('sync/', SyncView.as_view(), name='sync'),
+    path('goals/', NutritionGoalListCreateView.as_view(),
+         name='goal_list_create'),
+    path('goals/progress/', GoalProgressView.as_view(), name='goal_progress'),
+    path('goals/progress/report/', GoalProgressReportView.as_view(),
+         name='goal_progress_report'),
+    path('goals/<int:pk>', NutritionGoalRetrieveUpdateDestroyView.as_view(),
+         name='goal_retrieve_update_destroy'),
+    path('jobs/', JobListView.as_view(), name='job_list'),
+    path('jobs/<int:pk>', JobRetrieveView.as_view(), name='job_retrieve'),
 ]
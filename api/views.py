@@ -6,14 +6,22 @@ from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView
 
-from .models import FoodItem, Meal, MealFoodItem
-from .serializers import (FoodItemSerializer, MealFoodItemSerializer,
-                          MealSerializer, UserRegisterSerializer,
+from .goals import evaluate_goals
+from .models import FoodItem, Job, Meal, MealFoodItem, NutritionGoal
+from .serializers import (FoodItemImportSerializer, FoodItemSerializer,
+                          GoalProgressQuerySerializer, JobSerializer,
+                          MealFoodItemSerializer, MealSerializer,
+                          NutritionGoalSerializer, SyncMealFoodItemSerializer,
+                          SyncMealSerializer, UserRegisterSerializer,
                           UserSerializer)
+from .search import coalesced_search, filter_food_items
+from .tasks import FOOD_ITEM_ENTRY_FIELDS, enqueue
+from .throttling import AuthRateThrottle, FoodSearchRateThrottle, WriteRateThrottle
 
 
 class RegisterView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [AuthRateThrottle]
 
     def post(self, request):
         serializer = UserRegisterSerializer(data=request.data)
@@ -47,14 +55,56 @@ class FoodItemListViewCreate(generics.ListCreateAPIView):
     queryset = FoodItem.objects.all()
     serializer_class = FoodItemSerializer
     permission_classes = [IsAuthenticated]
+    throttle_classes = [FoodSearchRateThrottle, WriteRateThrottle]
+
+    def list(self, request, *args, **kwargs):
+        search_query = request.query_params.get('search', None)
+        if search_query is None:
+            return super().list(request, *args, **kwargs)
+        # Las búsquedas idénticas simultáneas comparten una sola consulta
+        data = coalesced_search(search_query, self._search)
+        return Response(data)
+
+    def _search(self, normalized_query):
+        queryset = filter_food_items(self.get_queryset(), normalized_query)
+        return list(self.get_serializer(queryset, many=True).data)
+
+    def perform_create(self, serializer):
+        # Los alimentos creados desde la API pertenecen al usuario autenticado
+        serializer.save(created_by=self.request.user)
+
+
+class FoodItemRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
+    queryset = FoodItem.objects.all()
+    serializer_class = FoodItemSerializer
+    permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        queryset = super().get_queryset()
-        search_query = self.request.query_params.get('search', None)
-        if search_query is not None:
-            queryset = queryset.filter(name__icontains=search_query) | \
-                queryset.filter(brand__icontains=search_query)
-        return queryset
+        # Solo los alimentos personalizados del propio usuario son editables
+        return FoodItem.objects.filter(created_by=self.request.user)
+
+    def perform_update(self, serializer):
+        previous = {field: getattr(serializer.instance, field)
+                    for field in FOOD_ITEM_ENTRY_FIELDS}
+        food_item = serializer.save()
+        # Recalcular las entradas de comidas afectadas fuera del ciclo de la petición
+        if any(getattr(food_item, field) != value for field, value in previous.items()):
+            enqueue('refresh_food_item_entries', {'food_item_id': food_item.id},
+                    user=self.request.user)
+
+    def perform_destroy(self, instance):
+        instance.soft_delete()
+
+
+class FoodItemImportView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = FoodItemImportSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        job = enqueue('import_food_items', serializer.validated_data,
+                      user=request.user)
+        return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
 
 
 class MealListCreateView(generics.ListCreateAPIView):
@@ -65,7 +115,11 @@ class MealListCreateView(generics.ListCreateAPIView):
 
     def get_queryset(self):
         # Solo muestra las comidas del usuario autenticado
-        return Meal.objects.filter(user=self.request.user).order_by('-date', 'meal_type')
+        # Los alimentos se cargan de una vez para calcular los totales sin
+        # consultas adicionales por comida
+        return (Meal.objects.filter(user=self.request.user)
+                .prefetch_related('meal_food_items__food_item')
+                .order_by('-date', 'meal_type'))
 
     def perform_create(self, serializer):
         # Asigna automáticamente el usuario autenticado a la comida
@@ -79,4 +133,124 @@ class MealRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
 
     def get_queryset(self):
         # Solo permite al usuario acceder a sus propias comidas
-        return Meal.objects.filter(user=self.request.user)
+        return (Meal.objects.filter(user=self.request.user)
+                .prefetch_related('meal_food_items__food_item'))
+
+    def perform_destroy(self, instance):
+        # Borrado lógico para que los clientes offline reciban el tombstone
+        instance.soft_delete()
+
+
+class SyncView(APIView):
+    permission_classes = [IsAuthenticated]
+    DEFAULT_LIMIT = 500
+    MAX_LIMIT = 1000
+
+    def get(self, request):
+        try:
+            since = int(request.query_params.get('since', 0))
+            limit = int(request.query_params.get('limit', self.DEFAULT_LIMIT))
+        except ValueError:
+            return Response({"detail": "Los parámetros 'since' y 'limit' deben ser enteros."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if since < 0 or limit < 1:
+            return Response({"detail": "Los parámetros 'since' y 'limit' deben ser positivos."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        limit = min(limit, self.MAX_LIMIT)
+
+        # Incluye las filas borradas (tombstones): el cliente debe eliminarlas
+        changes = {
+            'meals': (Meal.all_objects.filter(user=request.user), SyncMealSerializer),
+            'meal_food_items': (
+                MealFoodItem.all_objects.filter(
+                    meal__user=request.user).select_related('food_item'),
+                SyncMealFoodItemSerializer),
+            'foods': (FoodItem.all_objects.filter(created_by=request.user), FoodItemSerializer),
+        }
+        rows = {
+            key: list(queryset.filter(sync_seq__gt=since).order_by('sync_seq')[:limit + 1])
+            for key, (queryset, _) in changes.items()
+        }
+
+        # Si alguna tabla supera el límite, se corta en la secuencia más baja
+        # alcanzada para no saltarse cambios de las demás tablas
+        overflow = [items[limit - 1].sync_seq
+                    for items in rows.values() if len(items) > limit]
+        has_more = bool(overflow)
+        if has_more:
+            cursor = min(overflow)
+            rows = {key: [item for item in items if item.sync_seq <= cursor]
+                    for key, items in rows.items()}
+        else:
+            cursor = max((item.sync_seq for items in rows.values()
+                         for item in items), default=since)
+
+        data = {key: changes[key][1](items, many=True).data
+                for key, items in rows.items()}
+        data.update({"cursor": cursor, "has_more": has_more})
+        return Response(data)
+
+
+class NutritionGoalListCreateView(generics.ListCreateAPIView):
+    queryset = NutritionGoal.objects.all()
+    serializer_class = NutritionGoalSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return NutritionGoal.objects.filter(user=self.request.user)
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+
+class NutritionGoalRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
+    queryset = NutritionGoal.objects.all()
+    serializer_class = NutritionGoalSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return NutritionGoal.objects.filter(user=self.request.user)
+
+
+class GoalProgressView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        query = GoalProgressQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        return Response(evaluate_goals(
+            request.user, query.validated_data['start'], query.validated_data['end']))
+
+
+class GoalProgressReportView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        # Igual que GoalProgressView, pero generado en segundo plano
+        query = GoalProgressQuerySerializer(data=request.data)
+        query.is_valid(raise_exception=True)
+        job = enqueue('goal_progress_report',
+                      {'start': query.validated_data['start'].isoformat(),
+                       'end': query.validated_data['end'].isoformat()},
+                      user=request.user)
+        return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+class JobListView(generics.ListAPIView):
+    queryset = Job.objects.all()
+    serializer_class = JobSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        # Solo los trabajos lanzados por el usuario, sin los bloques hijos
+        return (Job.objects.filter(created_by=self.request.user, parent__isnull=True)
+                .with_children_counts()[:50])
+
+
+class JobRetrieveView(generics.RetrieveAPIView):
+    queryset = Job.objects.all()
+    serializer_class = JobSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return Job.objects.filter(created_by=self.request.user).with_children_counts()
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from datetime import timedelta
 from pathlib import Path
 
@@ -85,6 +86,17 @@ DATABASES = {
     }
 }
 
+# Perfil Postgres (por ejemplo para las pruebas de carga): DB_ENGINE=postgres
+if os.environ.get('DB_ENGINE') == 'postgres':
+    DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ.get('POSTGRES_DB', 'calorie_counter'),
+        'USER': os.environ.get('POSTGRES_USER', 'postgres'),
+        'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+        'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+        'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -132,15 +144,47 @@ CORS_ALLOWED_ORIGINS = [
     "http://127.0.0.1:5173",
 ]
 
+
+def throttle_rate(scope, default):
+    # THROTTLE_<ÁMBITO> cambia el límite (por ejemplo "600/min"); con "off"
+    # se desactiva. Útil para las pruebas de carga (ver README).
+    value = os.environ.get(f'THROTTLE_{scope.upper()}', default)
+    return None if value.lower() in ('', 'off', 'none') else value
+
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.AllowAny',
-    )
+    ),
+    # Límites por usuario para las peticiones autenticadas; el registro y
+    # los tokens se limitan por IP con su propio ámbito ('auth'). Detrás de
+    # un proxy inverso hay que fijar NUM_PROXIES para que la IP sea la del
+    # cliente y no la del proxy. Ver api/throttling.py
+    'DEFAULT_THROTTLE_CLASSES': (
+        'api.throttling.WriteRateThrottle',
+    ),
+    'DEFAULT_THROTTLE_RATES': {
+        'food_search': throttle_rate('food_search', '60/min'),
+        'writes': throttle_rate('writes', '60/min'),
+        'auth': throttle_rate('auth', '30/min'),
+    },
+}
+
+# Caché usada por los límites de peticiones y por la caché de búsquedas de
+# alimentos. Con varios procesos o nodos conviene una caché compartida
+# (Redis, Memcached) para que los límites sean globales.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
 }
 
+# Cola de trabajos en segundo plano (ver api/tasks.py y `manage.py run_worker`)
+JOB_BACKEND = 'api.tasks.DatabaseJobBackend'
+
 SIMPLE_JWT = {
     # Tiempo de vida del token de acceso
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
@@ -0,0 +1,438 @@
+#!/usr/bin/env python
+# Pruebas de carga con el tráfico diario típico de la aplicación.
+#
+# Solo usa la biblioteca estándar. Se ejecuta contra un servidor local ya
+# arrancado (`manage.py runserver`, gunicorn, uvicorn...), por ejemplo:
+#
+#   python loadtest/run.py --base-url http://127.0.0.1:8000/api \
+#       --profile sqlite --steps 1,5,10,20 --duration 30 --output sqlite.json
+#
+# Cada escalón mantiene N usuarios virtuales concurrentes durante el tiempo
+# indicado. Antes de empezar a medir, los usuarios nuevos del escalón se
+# registran y obtienen su token (register/ + token/); esas peticiones se
+# resumen aparte en "login" y no cuentan en el rendimiento del escalón. Luego
+# cada usuario repite la mezcla de tráfico: ráfagas de búsqueda de alimentos,
+# consulta del dashboard y registro de comidas con 3-10 alimentos. El informe
+# JSON recoge el rendimiento y las latencias p50/p95/p99 por endpoint (sin
+# contar las respuestas 429, que se resumen aparte) y el primer escalón en el
+# que aparecen errores o el throttle empieza a rechazar peticiones; con
+# --compare se compara con un informe anterior.
+
+import argparse
+import json
+import platform
+import random
+import string
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+
+MEAL_TYPES = ['desayuno', 'media_manana', 'almuerzo', 'merienda', 'cena', 'snack']
+
+# Peso relativo de cada acción en la mezcla de tráfico
+TRAFFIC_MIX = (
+    ('search_burst', 50),
+    ('dashboard', 35),
+    ('log_meal', 15),
+)
+
+REQUEST_TIMEOUT = 30
+# Todos los usuarios virtuales comparten IP y el servidor limita las
+# peticiones POST anónimas (register/, token/): los 429 y los fallos de
+# conexión al iniciar sesión se reintentan respetando Retry-After
+DEFAULT_RETRY_AFTER = 1.0
+
+
+class Recorder:
+    # Acumula (endpoint, estado, latencia) de forma segura entre hilos
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = []
+
+    def add(self, endpoint, status, latency):
+        with self._lock:
+            self.samples.append((endpoint, status, latency))
+
+    def drain(self):
+        with self._lock:
+            samples, self.samples = self.samples, []
+        return samples
+
+
+class Client:
+    def __init__(self, base_url, recorder):
+        self.base_url = base_url.rstrip('/') + '/'
+        self.recorder = recorder
+        self.token = None
+        self.retry_after = None
+
+    def request(self, endpoint, method, path, payload=None):
+        data = json.dumps(payload).encode() if payload is not None else None
+        request = urllib.request.Request(self.base_url + path, data=data, method=method)
+        request.add_header('Content-Type', 'application/json')
+        if self.token:
+            request.add_header('Authorization', f'Bearer {self.token}')
+
+        start = time.perf_counter()
+        headers = {}
+        try:
+            with urllib.request.urlopen(request, timeout=REQUEST_TIMEOUT) as response:
+                status, body, headers = response.status, response.read(), response.headers
+        except urllib.error.HTTPError as exc:
+            status, body, headers = exc.code, exc.read(), exc.headers
+        except (urllib.error.URLError, OSError):
+            # Conexión rechazada, timeout...: se registra como estado 0
+            status, body = 0, b''
+        self.recorder.add(endpoint, status, time.perf_counter() - start)
+        try:
+            self.retry_after = float(headers.get('Retry-After'))
+        except (TypeError, ValueError):
+            self.retry_after = None
+
+        try:
+            return status, json.loads(body) if body else None
+        except ValueError:
+            return status, None
+
+
+class VirtualUser:
+    def __init__(self, base_url, recorder, run_id, index, catalog, think_time,
+                 search_debounce=0):
+        self.client = Client(base_url, recorder)
+        self.username = f'load_{run_id}_{index}'
+        self.password = 'Carga-' + run_id + '-segura'
+        self.catalog = catalog
+        self.think_time = think_time
+        self.search_debounce = search_debounce
+        self.next_meal = 0
+        self.random = random.Random(f'{run_id}-{index}')
+
+    def request_with_retry(self, deadline, endpoint, method, path, payload=None):
+        # Repite la petición mientras el servidor la limite o no responda
+        while True:
+            status, data = self.client.request(endpoint, method, path, payload)
+            if status not in (0, 429):
+                return status, data
+            wait = self.client.retry_after or DEFAULT_RETRY_AFTER
+            if time.monotonic() + wait > deadline:
+                return status, data
+            time.sleep(wait)
+
+    def login(self, timeout):
+        # El registro devuelve 400 si el usuario ya existe (reintentos o
+        # escalones anteriores): basta con que después se obtenga el token
+        deadline = time.monotonic() + timeout
+        self.request_with_retry(deadline, 'register', 'POST', 'register/', {
+            'username': self.username,
+            'email': f'{self.username}@example.com',
+            'password': self.password,
+            'password2': self.password,
+        })
+        status, data = self.request_with_retry(deadline, 'token', 'POST', 'token/', {
+            'username': self.username, 'password': self.password,
+        })
+        if status == 200:
+            self.client.token = data['access']
+        return status == 200
+
+    def pause(self):
+        if self.think_time:
+            time.sleep(self.random.uniform(0.5, 1.5) * self.think_time)
+
+    def search_burst(self):
+        # Simula escribir en el buscador. Como el cliente web, busca desde la
+        # tercera letra y, sin debounce, lanza una petición por tecla; con
+        # debounce solo cuando la pausa hasta la siguiente tecla lo supera y
+        # al terminar de escribir.
+        word = self.random.choice(self.random.choice(self.catalog)['name'].split())
+        last = min(len(word), 8)
+        for length in range(1, last + 1):
+            gap = self.random.uniform(0.05, 0.2) if length < last else None
+            if length >= 3 and (gap is None or gap >= self.search_debounce):
+                self.client.request('foods_search', 'GET',
+                                    'foods/?search=' + urllib.request.quote(word[:length]))
+            if gap is not None:
+                time.sleep(gap)
+
+    def dashboard(self):
+        self.client.request('meals_list', 'GET', 'meals/')
+
+    def log_meal(self):
+        # Cada usuario rellena las comidas de hoy hacia atrás para no chocar
+        # con la restricción de una comida por tipo y día
+        day = date.today() - timedelta(days=self.next_meal // len(MEAL_TYPES))
+        meal_type = MEAL_TYPES[self.next_meal % len(MEAL_TYPES)]
+        self.next_meal += 1
+        count = self.random.randint(3, min(10, len(self.catalog)))
+        foods = self.random.sample(self.catalog, count)
+        self.client.request('meals_create', 'POST', 'meals/', {
+            'date': day.isoformat(),
+            'meal_type': meal_type,
+            'meal_food_items': [
+                {'food_item': food['id'], 'quantity': str(self.random.randint(20, 300))}
+                for food in foods
+            ],
+        })
+
+    def run_until(self, deadline):
+        actions, weights = zip(*TRAFFIC_MIX)
+        while time.monotonic() < deadline:
+            getattr(self, self.random.choices(actions, weights)[0])()
+            self.pause()
+
+
+def percentile(sorted_values, pct):
+    # Percentil por rango más cercano
+    if not sorted_values:
+        return None
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def latency_ms(sorted_values, pct):
+    value = percentile(sorted_values, pct)
+    return round(value * 1000, 1) if value is not None else None
+
+
+def summarize(samples, elapsed):
+    # Las respuestas limitadas (429) se cuentan aparte: son rechazos rápidos
+    # del throttle y no dicen nada de lo que el servidor es capaz de atender.
+    # El rendimiento, los percentiles y la tasa de errores se calculan solo
+    # sobre las respuestas atendidas.
+    endpoints = {}
+    for endpoint, status, latency in samples:
+        endpoints.setdefault(endpoint, []).append((status, latency))
+
+    summary = {}
+    for endpoint, results in sorted(endpoints.items()):
+        served = [(status, latency) for status, latency in results if status != 429]
+        latencies = sorted(latency for _, latency in served)
+        errors = sum(1 for status, _ in served if status == 0 or status >= 500)
+        throttled = len(results) - len(served)
+        summary[endpoint] = {
+            'requests': len(results),
+            'served': len(served),
+            'errors': errors,
+            'throttled': throttled,
+            'client_errors': sum(1 for status, _ in served if 400 <= status < 500),
+            'error_rate': round(errors / len(served), 4) if served else 0.0,
+            'throttle_rate': round(throttled / len(results), 4),
+            'throughput_rps': round(len(served) / elapsed, 2),
+            'throttled_rps': round(throttled / elapsed, 2),
+            'p50_ms': latency_ms(latencies, 50),
+            'p95_ms': latency_ms(latencies, 95),
+            'p99_ms': latency_ms(latencies, 99),
+        }
+    total = len(samples)
+    total_throttled = sum(stats['throttled'] for stats in summary.values())
+    total_served = total - total_throttled
+    total_errors = sum(stats['errors'] for stats in summary.values())
+    return {
+        'requests': total,
+        'served': total_served,
+        'errors': total_errors,
+        'throttled': total_throttled,
+        'error_rate': round(total_errors / total_served, 4) if total_served else 0.0,
+        'throttle_rate': round(total_throttled / total, 4) if total else 0.0,
+        'throughput_rps': round(total_served / elapsed, 2),
+        'endpoints': summary,
+    }
+
+
+def prepare_catalog(base_url, recorder, run_id, min_foods, login_timeout):
+    # Garantiza un catálogo mínimo para poder registrar comidas de 3-10
+    # alimentos distintos
+    admin = VirtualUser(base_url, recorder, run_id, 'setup', [], 0)
+    if not admin.login(login_timeout):
+        sys.exit("No se pudo registrar el usuario de preparación. ¿Está el servidor arrancado?")
+    status, catalog = admin.client.request('setup', 'GET', 'foods/')
+    catalog = catalog or []
+    for index in range(len(catalog), min_foods):
+        status, food = admin.client.request('setup', 'POST', 'foods/', {
+            'name': f'Alimento de carga {run_id} {index}',
+            'calories': str(random.randint(20, 400)),
+            'proteins': str(random.randint(0, 30)),
+            'fats': str(random.randint(0, 20)),
+            'carbs': str(random.randint(0, 60)),
+        })
+        if status == 201:
+            catalog.append(food)
+    if len(catalog) < 3:
+        sys.exit("El catálogo de alimentos tiene menos de 3 elementos.")
+    recorder.drain()
+    return catalog
+
+
+def login_users(users, login_timeout):
+    # Inicia sesión en paralelo con los usuarios que aún no tienen token
+    pending = [user for user in users if user.client.token is None]
+    if pending:
+        with ThreadPoolExecutor(max_workers=len(pending)) as pool:
+            list(pool.map(lambda user: user.login(login_timeout), pending))
+    return [user for user in users if user.client.token is not None]
+
+
+def run_step(base_url, recorder, run_id, users, concurrency, duration, catalog, think_time,
+             login_timeout, search_debounce):
+    recorder.drain()
+    # Los usuarios virtuales se reutilizan entre escalones
+    while len(users) < concurrency:
+        users.append(VirtualUser(base_url, recorder, run_id, len(users), catalog, think_time,
+                                 search_debounce))
+
+    # El inicio de sesión queda fuera del tiempo medido
+    login_start = time.monotonic()
+    active = login_users(users[:concurrency], login_timeout)
+    login_samples = recorder.drain()
+    login = summarize(login_samples, time.monotonic() - login_start) if login_samples else None
+    if not active:
+        return {'active_users': 0, 'login': login, **summarize([], duration)}
+
+    start = time.monotonic()
+    deadline = start + duration
+    with ThreadPoolExecutor(max_workers=len(active)) as pool:
+        list(pool.map(lambda user: user.run_until(deadline), active))
+    return {'active_users': len(active), 'login': login,
+            **summarize(recorder.drain(), time.monotonic() - start)}
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(previous, current):
+    # Diferencias de rendimiento y p95 por escalón y endpoint
+    print(f"\nComparación con {previous['meta'].get('revision')} ({previous['meta'].get('profile')})")
+    previous_steps = {step['concurrency']: step for step in previous['steps']}
+    for step in current['steps']:
+        before = previous_steps.get(step['concurrency'])
+        if before is None:
+            continue
+        print(f"  concurrencia {step['concurrency']}:")
+        for endpoint, stats in step['endpoints'].items():
+            old = before['endpoints'].get(endpoint)
+            if old is None:
+                continue
+            print(f"    {endpoint:14} rps {old['throughput_rps']:>8} -> {stats['throughput_rps']:<8}"
+                  f" p95 {str(old['p95_ms']):>8} -> {stats['p95_ms']} ms")
+
+
+def print_step(step):
+    print(f"concurrencia {step['concurrency']:>4}: {step['throughput_rps']} req/s atendidas, "
+          f"errores {step['errors']}/{step['served']} ({step['error_rate']:.2%}), "
+          f"limitadas (429) {step['throttled']}/{step['requests']} ({step['throttle_rate']:.2%})")
+    if step['active_users'] < step['concurrency']:
+        print(f"    AVISO: solo {step['active_users']} de {step['concurrency']} usuarios "
+              f"iniciaron sesión; el escalón se midió con {step['active_users']}")
+    for endpoint, stats in step['endpoints'].items():
+        print(f"    {endpoint:14} n={stats['requests']:<6} rps={stats['throughput_rps']:<8} "
+              f"p50={stats['p50_ms']}ms p95={stats['p95_ms']}ms p99={stats['p99_ms']}ms "
+              f"err={stats['errors']} 429={stats['throttled']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pruebas de carga del contador de calorías.")
+    parser.add_argument('--base-url', default='http://127.0.0.1:8000/api')
+    parser.add_argument('--profile', default='sqlite',
+                        help="Etiqueta del perfil de base de datos del servidor (sqlite, postgres...).")
+    parser.add_argument('--steps', default='1,5,10,20,40',
+                        help="Usuarios concurrentes de cada escalón, separados por comas.")
+    parser.add_argument('--duration', type=float, default=30,
+                        help="Segundos que dura cada escalón.")
+    parser.add_argument('--think-time', type=float, default=0.5,
+                        help="Pausa media en segundos entre acciones de un usuario.")
+    parser.add_argument('--error-threshold', type=float, default=0.01,
+                        help="Tasa de errores (5xx o fallos de conexión) o de respuestas "
+                             "limitadas (429) que marca el punto de ruptura.")
+    parser.add_argument('--search-debounce', type=float, default=0,
+                        help="Debounce en segundos del buscador del cliente (0: una "
+                             "petición por tecla, como el cliente web actual).")
+    parser.add_argument('--min-foods', type=int, default=30,
+                        help="Tamaño mínimo del catálogo de alimentos.")
+    parser.add_argument('--login-timeout', type=float, default=180,
+                        help="Segundos máximos que un usuario reintenta el inicio de sesión "
+                             "limitado (429) antes de quedar fuera del escalón.")
+    parser.add_argument('--keep-going', action='store_true',
+                        help="Continúa con los siguientes escalones tras el punto de ruptura.")
+    parser.add_argument('--output', help="Fichero donde guardar el informe JSON.")
+    parser.add_argument('--compare', help="Informe JSON anterior con el que comparar.")
+    args = parser.parse_args(argv)
+
+    steps = [int(value) for value in args.steps.split(',') if value.strip()]
+    run_id = ''.join(random.choices(string.ascii_lowercase + string.digits, k=8))
+    recorder = Recorder()
+    catalog = prepare_catalog(args.base_url, recorder, run_id, args.min_foods,
+                              args.login_timeout)
+
+    report = {
+        'meta': {
+            'profile': args.profile,
+            'base_url': args.base_url,
+            'revision': git_revision(),
+            'started_at': datetime.now(timezone.utc).isoformat(),
+            'duration_per_step': args.duration,
+            'login_timeout': args.login_timeout,
+            'think_time': args.think_time,
+            'error_threshold': args.error_threshold,
+            'search_debounce': args.search_debounce,
+            'traffic_mix': dict(TRAFFIC_MIX),
+            'python': platform.python_version(),
+        },
+        'steps': [],
+        'breaking_point': None,
+    }
+
+    users = []
+    for concurrency in steps:
+        step = run_step(args.base_url, recorder, run_id, users, concurrency,
+                        args.duration, catalog, args.think_time, args.login_timeout,
+                        args.search_debounce)
+        step = {'concurrency': concurrency, **step}
+        report['steps'].append(step)
+        if not step['active_users']:
+            print(f"Ningún usuario pudo iniciar sesión en el escalón de {concurrency}; "
+                  "se detiene la prueba.")
+            break
+        print_step(step)
+        # Si el throttle rechaza más peticiones que el umbral, los escalones
+        # siguientes miden el límite configurado y no la capacidad del nodo
+        if step['error_rate'] > args.error_threshold:
+            reason = 'errors'
+        elif step['throttle_rate'] > args.error_threshold:
+            reason = 'throttled'
+        else:
+            reason = None
+        if report['breaking_point'] is None and reason:
+            report['breaking_point'] = {
+                'concurrency': concurrency,
+                'reason': reason,
+                'error_rate': step['error_rate'],
+                'throttle_rate': step['throttle_rate'],
+                'throughput_rps': step['throughput_rps'],
+            }
+            print(f"Punto de ruptura: {concurrency} usuarios concurrentes"
+                  + (" (limitado por el throttle)" if reason == 'throttled' else ""))
+            if not args.keep_going:
+                break
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+        print(f"Informe guardado en {args.output}")
+    if args.compare:
+        with open(args.compare) as previous:
+            compare(json.load(previous), report)
+    return report
+
+
+if __name__ == '__main__':
+    main()